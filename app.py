@@ -16,13 +16,18 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 """
 
-from utils.autosolver import solve
+from utils import startup # first, it starts the startup clock
+from utils.autosolver import solve, SolveProgress
+from utils.incremental import SolutionTracker
+from utils.engine import Game
 from utils.file_handler import resource_path, load_resources
-from utils.constants import FRAME_SIZE_MULT, VERSION
-from utils.api import get_info, get_latest_version, get_news, join_game
+from utils.textures import preload as preload_textures, image_source
+from utils.constants import FRAME_SIZE_MULT, SPRITE_POOL_SIZE, TILE_SOUND, SONGS, TELEMETRY_PATH
+from utils.audio import AudioManager
 from utils.custom_labels import NewsLabel, WinLabel, NormButton, NormButtonNoSound
+from utils import profiler
 
-import random
+import os
 from copy import deepcopy
 import trio
 import time
@@ -34,7 +39,6 @@ from kivy.logger import Logger
 from kivy.config import ConfigParser
 from kivy.factory import Factory
 from kivy.core.window import Window
-from kivy.core.audio import SoundLoader
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivy.uix.popup import Popup
 from kivy.uix.button import Button
@@ -43,11 +47,15 @@ from kivy.uix.stacklayout import StackLayout
 from kivy.uix.modalview import ModalView
 from kivy.animation import Animation
 
+# utils.api (requests), kivy.core.audio and the solution cache are loaded by PuzzleApp.load_* after the first frame
+startup.mark("imports")
+
 
 inst = None
 sound_effects = True
 tile_indication = True
 tile_movement = 0
+grid_size = 3
 game_stats = None
 autosolver_count = 0
 
@@ -61,32 +69,47 @@ class InfoWindow(Screen):
         self.width, self.height = Window.size
         self.layout = StackLayout(padding=(self.width//10, self.height//10, self.width//10, self.height//10), spacing=10)
         self.text_info = []
-        CREDITS = get_info()
-        for item in CREDITS:
+        self.show_info({"Info": "Loading..."})
+        self.add_widget(self.layout)
+        from utils.api import get_info, start as start_request
+        start_request(inst.nursery, get_info, self.show_info)
+
+    def show_info(self, credits: dict):
+        """
+        Fill the layout with the credits (called again once they are downloaded)
+        """
+        self.layout.clear_widgets()
+        self.text_info = []
+        for item in credits:
             text = Label(
-                text=f"{item}:\n| {CREDITS[item]}",
+                text=f"{item}:\n| {credits[item]}",
                 font_size=self.width//20 if self.width < self.height else self.height//40 + self.width//75,
                 size_hint=(0.5, 0.2) if self.height > self.width else (0.33, 0.33),
                 halign="left",
                 valign="center"
             )
+            text.bind(size=self.wrap_text)
             self.text_info.append(text)
             self.layout.add_widget(text)
-            
-        self.add_widget(self.layout)
+
+    def wrap_text(self, label, size):
+        label.text_size = size
 
     def on_enter(self):
-        self.clock = Clock.schedule_interval(self.resize, 0.1)
+        Window.bind(on_resize=self.resize)
 
-    def resize(self, dt):
-        self.width, self.height = Window.size
+    def resize(self, window, width, height):
+        """
+        Only called when the window size changes
+        """
+        self.width, self.height = width, height
         for text in self.text_info:
             text.font_size = self.width//20 if self.width < self.height else self.height//40 + self.width//75
             text.size_hint = (0.5, 0.2) if self.height > self.width else (0.33, 0.33)
-            text.text_size = text.size
         self.layout.padding = self.width//10, self.height//10, self.width//10, self.height//10 # left, up, right, down
 
     def on_leave(self):
+        Window.unbind(on_resize=self.resize)
         self.remove_widget(self.layout)
     
     def open_news(self):
@@ -103,11 +126,8 @@ class InfoWindow(Screen):
             background=resource_path("assets/bg/bg.png")
         )
         page.open()
-        content.text=get_news()
-    
-    def on_latest_version(self):
-        latest_version = get_latest_version()
-        return VERSION == latest_version or latest_version is None
+        from utils.api import get_news, start as start_request
+        start_request(inst.nursery, get_news, lambda news: setattr(content, "text", news))
 
 
 class WinWindow(Screen):
@@ -122,12 +142,23 @@ class WinWindow(Screen):
         self.remove_widget(self.stats)
 
 
+class TileSprite(Button):
+    """
+    Copy of a tile drawn on top of the board while it slides, it never takes touches
+    """
+
+    def on_touch_down(self, touch):
+        return False
+
+
 class GameWindow(Screen):
     """
     This is the game screen.
     """
 
-    tile_moving = None
+    sliding = {} # animation sprite -> tile button it covers while sliding
+    free_sprites = []
+    solver_scope = None # cancel scope of the running autosolver task
 
     def on_pre_enter(self):
         """
@@ -142,59 +173,39 @@ class GameWindow(Screen):
             pos_hint = {"center_x": 0.5, "center_y": 0.5}
         )
         self.add_widget(loading)
-        self.tile_move_sound = SoundLoader.load(resource_path("sound_effects/tile_sliding.wav"))
 
     def on_enter(self):
         """
-        Once in game, load sound effects and clear all widgets (the loading label)
+        Once in game, clear all widgets (the loading label)
         """
-        #self.tile_move_sound.volume = 0.2 # Does not work with android (just throws an error like sound/volume is not defined)
         self.clear_widgets()
         self.init_game()
 
     
-    def remove_anim_widget(self, anim, widget):
+    def get_sprite(self) -> Button:
         """
-        Called when an animation finishes
-        This function removes the animated widget from the screen
+        A free animation sprite from the pool (a new one is only made if they are all sliding)
         """
-        item = self.tile_moving
-        y = (self.btns[0]+self.btns[1]+self.btns[2]).index(self.tile_moving) // 3
-        x = self.btns[y].index(self.tile_moving)
-        if [[1,2,3], [4,5,6], [7,8,-1]][y][x] == int(item.background_normal[-5]) or not tile_indication:
-            item.opacity = 1
-        else:
-            item.opacity = 0.8
-        self.remove_widget(widget)
+        if self.free_sprites:
+            return self.free_sprites.pop()
+        sprite = TileSprite(size_hint=(None, None), opacity=0)
+        self.add_widget(sprite)
+        return sprite
 
-    def anim_in_progress(self, anim, widget, progress):
+    def remove_anim_widget(self, anim, sprite):
         """
-        Called when animation is in progress
-        This function ensures the opacity of moving tile (not the animated) opacity is 0
-        """
-        self.tile_moving.opacity = 0
-
-    def getInvCount(self, arr: list):
-        """
-        Helper function for is_solvable(puzzle)
-        """
-        inv_count, empty_value = 0, -1
-        for i in range(0, 9):
-            for j in range(i + 1, 9):
-                if arr[j] != empty_value and arr[i] != empty_value and arr[i] > arr[j]:
-                    inv_count += 1
-
-        return inv_count
-    
-    def is_solvable(self, puzzle: list) -> bool:
-        """
-        Returns True if the 8 puzzle is solvable and vice versa
+        Called when an animation finishes
+        This function hides the sprite, puts it back in the pool and shows the tile it was covering
         """
-        # Count inversions in given 8 puzzle
-        inv_count = self.getInvCount([j for sub in puzzle for j in sub])
+        item = self.sliding.pop(sprite, None)
+        if item is None: # left over from the last game
+            return
+        sprite.opacity = 0
+        self.free_sprites.append(sprite)
+        if item in self.sliding.values(): # another sprite is sliding onto the same tile
+            return
 
-        # return true if inversion count is even.
-        return inv_count % 2 == 0
+        self.update_tile(*self.btn_cell[item]) # the cell may be the empty tile by now
 
     def init_game(self, *args):
         """
@@ -202,17 +213,17 @@ class GameWindow(Screen):
         """
         self.width, self.height = Window.size
         self.font_size = self.width//20
-        self.grid = [[], [], []]
-        self.btns = [[], [], []]
-        self.moves = 0
-        self.timer = 0
+        self.size_n = grid_size # settings only apply to new games
+        self.game = Game(self.size_n)
+        self.btns = [[] for _ in range(self.size_n)]
+        self.solution_tracker = SolutionTracker(self.size_n)
         self.autosolving = False
         self.timer_pressed = 0
 
         # Add frame to screen
         self.puzzle_frame = Button(
-            background_normal = resource_path("assets/bg/frame.png"),
-            background_down = resource_path("assets/bg/frame.png"),
+            background_normal = image_source("assets/bg/frame.png"),
+            background_down = image_source("assets/bg/frame.png"),
             size_hint = (None, None)
         )
         self.add_widget(self.puzzle_frame)
@@ -252,8 +263,8 @@ class GameWindow(Screen):
                 self.width - (self.width//7 if self.width < self.height else self.height//8), 
                 (self.width//80 if self.width < self.height else self.height//80)
                 ),
-            background_normal = resource_path("assets/btns/back.png"),
-            background_down = resource_path("assets/btns/back.png")
+            background_normal = image_source("assets/btns/back.png"),
+            background_down = image_source("assets/btns/back.png")
         )
         self.quit_btn.bind(on_release=self.quit_game)
         self.add_widget(self.quit_btn)
@@ -263,23 +274,62 @@ class GameWindow(Screen):
         except Exception:
             pass
         self.clock = Clock.schedule_interval(self.timer_callback, 0.1)
+        Window.bind(on_resize=self.resize)
 
-        # Logs game start
-        join_game()
+        # Logs game start (uploaded later in a batch)
+        inst.telemetry.record("game_start", size=self.size_n)
 
         # Starts the game
         self.create_grid(True)
+        self.resize(Window, *Window.size)
 
+        # Timings overlay (only when profiling), added last so it is drawn on top
+        try:
+            self.profile_clock.cancel()
+        except Exception:
+            pass
+        if profiler.enabled:
+            self.profile_label = Label(
+                font_size = self.font_size//3,
+                size_hint = (0.5, 0.3),
+                pos_hint = {"x": 0.01, "top": 0.86},
+                halign = "left",
+                valign = "top"
+            )
+            self.profile_label.bind(size=self.profile_label.setter("text_size"))
+            self.add_widget(self.profile_label)
+            self.profile_clock = Clock.schedule_interval(self.update_profile, 0.5)
+
+    def on_leave(self):
+        try:
+            self.clock.cancel()
+        except Exception:
+            pass
+        try:
+            self.profile_clock.cancel()
+        except Exception:
+            pass
+        Window.unbind(on_resize=self.resize)
+
+    def update_profile(self, dt):
+        self.profile_label.text = profiler.summary()
+
+    @profiler.timed("game.timer_callback")
     def timer_callback(self, dt):
         """
-        A function to update the timer and game objects sizes (in case screen gets resized)
-        This ensures the tiles are squares and fit in the screen
+        Updates the timer once the first move has been made
         """
-        if self.moves > 0:
-            self.timer += 0.1
-            self.timer_btn.text = f"{round(self.timer, 1)}s"
+        self.game.tick(dt)
+        if self.game.moves > 0:
+            self.timer_btn.text = f"{round(self.game.timer, 1)}s"
 
-        self.width, self.height = Window.size
+    @profiler.timed("game.resize")
+    def resize(self, window, width, height):
+        """
+        Sizes and places the game objects, called when the game starts and whenever the window is resized
+        This ensures the tiles are squares and fit in the screen
+        """
+        self.width, self.height = width, height
         self.font_size = self.width//20
 
         self.timer_btn.font_size = self.font_size//1.8 if self.width > self.height else self.font_size
@@ -300,18 +350,18 @@ class GameWindow(Screen):
                 )
 
         size = self.height//FRAME_SIZE_MULT if self.height < self.width else self.width//FRAME_SIZE_MULT
-        # [btn1.pos, btn2.pos, btn3.pos]
-        x_pos = [self.width//2 - self.height//4.2, self.width//2, self.width//2 + self.height//4.2] \
-                if self.width > self.height else \
-                [self.width//2 - self.width//4.2, self.width//2, self.width//2 + self.width//4.2]
-        y_pos = [self.height//2 - self.height//4.2, self.height//2, self.height//2 + self.height//4.2] \
-                if self.width > self.height else \
-                [self.height//2 - self.width//4.2, self.height//2, self.height//2 + self.width//4.2]
+        # [btn1.pos, btn2.pos, ..., btnN.pos] (tiles are spaced evenly around the centre of the screen)
+        n = self.size_n
+        spacing = (self.height//4.2 if self.width > self.height else self.width//4.2) * 3 / n
+        offsets = [(i - (n - 1) / 2) * spacing for i in range(n)]
+        x_pos = [self.width//2 + offset for offset in offsets]
+        y_pos = [self.height//2 + offset for offset in offsets]
         
         for y, row in enumerate(self.btns[::-1]):
             for x, item in enumerate(row):
-                item_size = size//3.38
+                item_size = (size * 3 / n)//3.38
                 item.size = item_size, item_size
+                item.font_size = item_size//2.5
                 # pos = pos - size of tile
                 item.pos = (x_pos[x] - item_size//2, y_pos[y] - item_size//2) \
                             if self.width > self.height else \
@@ -320,140 +370,128 @@ class GameWindow(Screen):
         # This adjusts the size of the frame "holding" the tiles
         self.puzzle_frame.size = size, size
         c = 0.045
-        self.puzzle_frame.pos = (self.btns[2][0].pos[0] - c*self.height, self.btns[2][0].pos[1] - c*self.height) \
+        self.puzzle_frame.pos = (self.btns[-1][0].pos[0] - c*self.height, self.btns[-1][0].pos[1] - c*self.height) \
                                 if self.width > self.height else \
-                                (self.btns[2][0].pos[0] - c*self.width, self.btns[2][0].pos[1] - c*self.width) #TODO: delete
+                                (self.btns[-1][0].pos[0] - c*self.width, self.btns[-1][0].pos[1] - c*self.width) #TODO: delete
         self.puzzle_frame.pos_hint = {"center_x": 0.5, "center_y": 0.5}
 
+    def tile_image(self, tile: int) -> str:
+        """
+        Numbered tile images only go up to 8, so bigger boards use a plain tile with the number as text
+        """
+        if (self.size_n > 3 and tile > 0) or tile == -1: # the empty tile is never shown
+            return image_source("assets/tiles/button.png")
+        return image_source(f"assets/tiles/button{tile}.png")
+
+    def tile_text(self, tile: int) -> str:
+        return str(tile) if self.size_n > 3 and tile > 0 else ""
+
+    @profiler.timed("game.create_grid")
     def create_grid(self, start: bool=False, move: str=None):
-        before = None
+        n = self.size_n
         if start: # Start new game
-            # Generate grid (3 x 3)
-            count = 1
-            while True:
-                grid = random.sample([1, 2, 3, 4, 5, 6, 7, 8, -1], 9)
-                grid = [grid[:3], grid[3:6], grid[6:9]]
-                if self.is_solvable(grid):
-                    break
-                count += 1
-            Logger.info(f"Game: Generated puzzle in {count} tries")
-
-            self.grid = grid
+            Logger.info(f"Game: Generated puzzle in {self.game.tries} tries")
+            grid = self.game.grid
+            self.btn_cell = {}
             for y, row in enumerate(grid):
                 for x, item in enumerate(row):
                     self.btns[y].append(
                         Button(
                             size_hint = (None, None),
-                            background_normal = resource_path(f"assets/tiles/button{item}.png"), 
-                            background_down = resource_path(f"assets/tiles/button{item}.png"), 
+                            background_normal = self.tile_image(item), 
+                            background_down = self.tile_image(item), 
+                            text = self.tile_text(item),
                             opacity = 1,
                             disabled = not item > 0,
                             )
                         )
                     self.btns[y][x].bind(on_press=self.btn_click)
+                    self.btn_cell[self.btns[y][x]] = (y, x)
                     self.add_widget(self.btns[y][x])
 
+            # Sprites for the slide animations, added after the tiles so they are drawn on top
+            self.sliding = {}
+            self.free_sprites = [TileSprite(size_hint=(None, None), opacity=0) for _ in range(SPRITE_POOL_SIZE)]
+            for sprite in self.free_sprites:
+                self.add_widget(sprite)
+
+            for y in range(n):
+                for x in range(n):
+                    self.update_tile(y, x)
+
         else:
-            before = deepcopy(self.grid)
-            self.grid = self.checker(self.grid, move)
-            self.moves += 1
+            changed = self.game.move(move)
+            if changed is None:
+                return
+            (y, x), (ty, tx) = changed # the tile moved from (ty, tx) to (y, x)
+            self.solution_tracker.follow(move)
             
             # Play tile moving sound effect
             if sound_effects:
-                self.tile_move_sound.play()
-
-        # Tile animation
-        if before is not None:
-            for y, row in enumerate(before):
-                for x, value in enumerate(row):
-                    if before[y][x] != self.grid[y][x] and self.grid[y][x] != -1:
-                        self.tile_moving = self.btns[y][x]
-                        ty = (self.grid[0]+self.grid[1]+self.grid[2]).index(-1) // 3
-                        tx = self.grid[ty].index(-1)
-                        temp_btn = Button(
-                            background_normal = resource_path(f"assets/tiles/button{self.grid[y][x]}.png"),
-                            background_down = resource_path(f"assets/tiles/button{self.grid[y][x]}.png"),
-                            opacity = 0.8 if tile_indication else 1,
-                            size = self.btns[0][0].size,
-                            size_hint = self.btns[0][0].size_hint,
-                            pos = self.btns[ty][tx].pos
-                        )
-
-                        ty = (self.grid[0]+self.grid[1]+self.grid[2]).index(self.grid[y][x]) // 3
-                        tx = self.grid[ty].index(self.grid[y][x])
-
-                        self.add_widget(temp_btn)
-                        bx, by = self.btns[ty][tx].pos # tempy and tempx
-                        anim = Animation(x=bx, y=by, duration=tile_movement)
-                        anim.bind(
-                            on_progress = self.anim_in_progress,
-                            on_complete = self.remove_anim_widget
-                            )
-                        anim.start(temp_btn)
-
-        # Updating buttons
-        for y, row in enumerate(self.btns):
-            for x, item in enumerate(row):
-                item.background_normal = resource_path(f"assets/tiles/button{self.grid[y][x]}.png")
-                item.background_down = resource_path(f"assets/tiles/button{self.grid[y][x]}.png")
-
-                if item != self.tile_moving and item.background_normal[-6:-4] != "-1":
-                    """
-                    Checks if the tile is the current moving one or the empty tile
-                    """
-                    if [[1,2,3], [4,5,6], [7,8,-1]][y][x] == int(item.background_normal[-5]) or not tile_indication:
-                        item.opacity = 1
-                    else:
-                        item.opacity = 0.8
-
-                else:
-                    item.opacity = 0
-
-                item.disabled = item.background_normal[-6:-4] == "-1" # disable button if button is empty tile
+                inst.audio.play(TILE_SOUND)
+
+            # Tile animation
+            tile = self.game.grid[y][x]
+            sprite = self.get_sprite()
+            sprite.background_normal = sprite.background_down = self.tile_image(tile)
+            sprite.text = self.tile_text(tile)
+            sprite.font_size = self.btns[y][x].font_size
+            sprite.size = self.btns[y][x].size
+            sprite.pos = self.btns[ty][tx].pos
+            sprite.opacity = 0.8 if tile_indication else 1
+            self.sliding[sprite] = self.btns[y][x] # hidden by update_tile() until the sprite lands
+
+            bx, by = self.btns[y][x].pos # the moved tile's new position
+            anim = Animation(x=bx, y=by, duration=tile_movement)
+            anim.bind(on_complete=self.remove_anim_widget)
+            anim.start(sprite)
+
+            # Only the two cells of the move change
+            self.update_tile(y, x)
+            self.update_tile(ty, tx)
         
-        if self.check_win(self.grid):
+        if self.game.won:
             def show_win_window(dt):
                 inst.root.current = "WinWindow"
                 self.manager.transition.direction = "left"
 
             # Win Game
+            inst.telemetry.record("win", size=self.size_n, moves=self.game.moves, time=round(self.game.timer, 2), autosolved=self.autosolving)
             global game_stats
             game_stats = f"""
 {'You win' if not self.autosolving else 'Puzzle solved'}!
 
-Time taken: {round(self.timer, 2)}s
-Moves: {self.moves}
+Time taken: {round(self.game.timer, 2)}s
+Moves: {self.game.moves}
 """
             Clock.schedule_once(show_win_window, 0.4)
-    
-    def checker(self, puzzle: list, move: str):
-        for i in range(3):
-            try:
-                c = puzzle[i].index(-1)
-            
-                if move == "up" and i > 0:
-                    puzzle[i][c] = puzzle[i-1][c]
-                    puzzle[i-1][c] = -1
-                    break
-                elif move == "down":
-                    puzzle[i][c] = puzzle[i+1][c]
-                    puzzle[i+1][c] = -1
-                    break
-                
-                elif move == "left" and c > 0:
-                    puzzle[i][c] = puzzle[i][c-1]
-                    puzzle[i][c-1] = -1
-                    break
-                elif move == "right":
-                    puzzle[i][c] = puzzle[i][c+1]
-                    puzzle[i][c+1] = -1
-                    break
-
-            except Exception as e:
-                pass
-
-        return puzzle
 
+    @profiler.timed("game.update_tile")
+    def update_tile(self, y: int, x: int):
+        """
+        Show the tile now in a cell on its button
+        """
+        item = self.btns[y][x]
+        tile = self.game.grid[y][x]
+        item.background_normal = self.tile_image(tile)
+        item.background_down = self.tile_image(tile)
+        item.text = self.tile_text(tile)
+
+        if tile != -1 and item not in self.sliding.values():
+            """
+            Checks if the tile is the current moving one or the empty tile
+            """
+            if self.game.goal[y][x] == tile or not tile_indication:
+                item.opacity = 1
+            else:
+                item.opacity = 0.8
+
+        else:
+            item.opacity = 0
+
+        item.disabled = tile == -1 # disable button if button is empty tile
+
+    @profiler.timed("game.btn_click")
     def btn_click(self, instance, autosolving=False):
         """
         Start tile movement when a tile is clicked
@@ -461,31 +499,15 @@ Moves: {self.moves}
         if self.autosolving and not autosolving:
             return
         
-        # Find Button from text
-        for y in self.grid:
-            for x in y:
-                if resource_path(f"assets/tiles/button{x}.png") == instance.background_normal or (x == -1 and instance.opacity == 0):
-                    pressed = self.grid.index(y), y.index(x)
-
-        y, x = pressed
-        for i in range(4):
-            try:
-                if i == 0 and self.grid[y][x+1] == -1:
-                    self.create_grid(False, "left"); break
-                if i == 1 and self.grid[y][x-1] == -1 and x-1 != -1:
-                    self.create_grid(False, "right"); break
-                if i == 2 and self.grid[y+1][x] == -1:
-                    self.create_grid(False, "up"); break
-                if i == 3 and self.grid[y-1][x] == -1 and y-1 != -1:
-                    self.create_grid(False, "down"); break
-            except Exception:
-                pass
-
-    def check_win(self, puzzle: list):
-        return puzzle == [[1, 2, 3], [4, 5, 6], [7, 8, -1]]
+        # Move the empty tile onto the pressed tile if they are next to each other
+        move = self.game.move_towards(self.btn_cell[instance])
+        if move is not None:
+            self.create_grid(False, move)
 
     def quit_game(self, *args):
         self.autosolving = False
+        if self.solver_scope is not None:
+            self.solver_scope.cancel()
         inst.root.current = "WelcomeWindow"
         self.manager.transition.direction = "right"
 
@@ -493,9 +515,9 @@ Moves: {self.moves}
         self.timer_pressed += 1
         if self.timer_pressed == 8:
             inst.play_btn_sound()
-            self.timer += 100
+            self.game.timer += 100
             self.timer_pressed = 0
-            self.timer_btn.text = f"{round(self.timer, 1)}s"
+            self.timer_btn.text = f"{round(self.game.timer, 1)}s"
     
     def start_autosolver(self, *args):
         """
@@ -506,51 +528,78 @@ Moves: {self.moves}
         
         global autosolver_count
         autosolver_count += 1
+        inst.telemetry.record("solve_used", size=self.size_n, moves=self.game.moves, time=round(self.game.timer, 2))
 
         self.autosolving = True
-        self.moves = 0
+        self.game.moves = 0
         self.autosolver_btn.text = "Solving..." if autosolver_count < 5 else "Cheating..."
         Logger.info("Game: Starting autosolver")
         inst.nursery.start_soon(self.autosolver)
     
     async def autosolver(self):
+        with trio.CancelScope() as self.solver_scope:
+            await self.run_autosolver()
+        self.solver_scope = None
+
+    async def show_solver_progress(self, progress: SolveProgress):
+        """
+        Show how far the solver has got on the autosolver button while it runs in another thread
+        """
+        text = "Solving..." if autosolver_count < 5 else "Cheating..."
+        while True:
+            await trio.sleep(0.1)
+            if progress.nodes > 0:
+                self.autosolver_btn.text = f"{text}\n{progress.nodes} nodes ({progress.depth})"
+
+    async def search_solution(self, progress: SolveProgress) -> list:
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(self.show_solver_progress, progress)
+            try:
+                # Solve in a worker thread so the UI keeps running
+                # If this task gets cancelled the thread is abandoned and told to stop
+                result = await trio.to_thread.run_sync(solve, deepcopy(self.game.grid), "auto", progress, inst.solution_cache, cancellable=True)
+            finally:
+                progress.cancel()
+            nursery.cancel_scope.cancel()
+        return result
+
+    async def run_autosolver(self):
         start_time = time.time()
-        moves = solve(self.grid)[1][1:]
+        progress = SolveProgress()
+        state = self.game.state()
+
+        # Splice the last solution if we are still on (or next to) its path
+        # 3x3 is solved optimally from the distance table faster than that anyway
+        spliced = self.solution_tracker.lookup(state) if self.size_n > 3 else None
+        if spliced is None:
+            result = await self.search_solution(progress)
+            moves = result[1][1:]
+            if len(moves) > 0:
+                self.solution_tracker.remember(state, moves, progress.optimal)
+        else:
+            moves, progress.optimal = spliced
+
         self.autosolver_btn.text = f"Solved [{round(time.time() - start_time, 1)}s]" if len(moves) > 0 else "No solution"
-        Logger.info(f"Game: Optimal route found ({len(moves)} moves)" if len(moves) > 0 else "No solution found")
+        Logger.info(f"Game: {'Optimal' if progress.optimal else 'Near optimal'} route found ({len(moves)} moves, {progress.nodes} nodes)" if len(moves) > 0 else "No solution found")
+        Logger.info(f"Game: Solution cache {inst.solution_cache.stats()}")
 
         if len(moves) == 0:
             self.autosolving = False
             return
         
-        # Find empty tile (saves it to x, y)
-        for y, row in enumerate(self.grid):
-            for x, i in enumerate(row):
-                if i == -1: break
-            if i == -1: break
-
         Logger.info("Game: Displaying solution")
         for move in moves:
             await trio.sleep(0.2)
             if not self.autosolving:
                 return
-            match move:
-                case "left":
-                    x -= 1
-                    self.btn_click(self.btns[y][x], True)
-                case "right":
-                    x += 1
-                    self.btn_click(self.btns[y][x], True)
-                case "up":
-                    y -= 1
-                    self.btn_click(self.btns[y][x], True)
-                case "down":
-                    y += 1
-                    self.btn_click(self.btns[y][x], True)
+            self.create_grid(False, move)
 
 
 class WindowManager(ScreenManager):
-    pass
+    def on_current(self, instance, value):
+        if value not in self.screen_names: # the screens are added by the last startup stages
+            inst.stages.finish()
+        super().on_current(instance, value)
 
 
 # APP
@@ -559,7 +608,8 @@ class PuzzleApp(App):
     def __init__(self, nursery):
         super().__init__()
         self.nursery = nursery
-        self.btn_sound = SoundLoader.load(resource_path("sound_effects/tile_sliding.wav"))
+        self.audio = AudioManager() # nothing is loaded until the first frame (see on_start)
+        self.stages = startup.Stages()
     
     def resource_path(self, relative_path):
         """
@@ -567,33 +617,86 @@ class PuzzleApp(App):
         """
         return resource_path(relative_path)
 
+    def image_source(self, relative_path):
+        """
+        Same as image_source() in utils/textures.py, for the kv file
+        """
+        return image_source(relative_path)
+
     def build(self):
         self.use_kivy_settings = False
         load_resources()
-        kv = Builder.load_file(resource_path("slidingpuzzle.kv"))
+        preload_textures() # before the kv file so its images come from the atlas
+        if profiler.enabled:
+            Clock.schedule_interval(profiler.frame, 0) # every frame
+            Window.bind(on_key_down=self.dump_profile)
+        kv = Builder.load_file(resource_path("slidingpuzzle.kv")) # only the WelcomeWindow, see load_screens()
+        startup.mark("build")
         return kv
 
+    def dump_profile(self, window, key, *args):
+        """
+        F12 writes the profiler's timings and counters to profile.json in the user data dir
+        """
+        if key == 293: # F12
+            path = os.path.join(self.user_data_dir, "profile.json")
+            profiler.dump(path)
+            Logger.info(f"Game: Profile written to {path}")
+
     def on_start(self):
         Window.update_viewport()
         
         self.title = "Sliding Puzzle by JustKitkat"
 
-        self.songs = ["piano1"]
-        Logger.info("Game: Loading songs")
-        self.bg_songs = [SoundLoader.load(resource_path(f"music/{song}.mp3")) for song in self.songs]
-        self.current = 0
-        for song in self.bg_songs:
-            song.bind(on_stop=self.play_song)
-            #song.volume = 0.1
         self.music_state = int(self.config.get("Audio", "music"))
-        self.play_song()
+
+        # Everything the welcome screen does not need, one stage per frame after the first one
+        self.stages.add("sound effects", self.load_sound_effects)
+        self.stages.add("network", self.load_network)
+        self.stages.add("solution cache", self.load_solution_cache)
+        self.stages.add("music", self.load_music)
+        for screen in (GameWindow, WinWindow, InfoWindow):
+            self.stages.add(screen.__name__, lambda screen=screen: self.root.add_widget(screen()))
+        Window.bind(on_flip=self.on_first_frame)
         
         global sound_effects
         global tile_indication
         global tile_movement
+        global grid_size
         sound_effects = int(self.config.get("Audio", "sound_effects"))
         tile_indication = int(self.config.get("Graphics", "tile_indication"))
         tile_movement = float(self.config.get("Graphics", "tile_movement").split(" ")[0])
+        grid_size = int(self.config.get("Game", "grid_size").split("x")[0])
+
+    def on_first_frame(self, window):
+        Window.unbind(on_flip=self.on_first_frame)
+        Logger.info(f"Startup: First frame after {round(startup.mark('first frame') * 1000)}ms")
+        self.stages.start()
+
+    def load_sound_effects(self):
+        self.audio.preload(TILE_SOUND)
+
+    def load_network(self):
+        """
+        requests alone takes longer to import than the rest of the app
+        """
+        from utils.api import set_cache_path
+        from utils.telemetry import Telemetry
+        from utils.version_check import VersionChecker
+        set_cache_path(os.path.join(self.user_data_dir, "api_cache.json"))
+        self.telemetry = Telemetry(os.path.join(self.user_data_dir, "telemetry.jsonl"))
+        if TELEMETRY_PATH is not None: # else the events only go to the journal
+            self.nursery.start_soon(self.telemetry.run)
+        self.version_checker = VersionChecker()
+        self.nursery.start_soon(self.version_checker.run)
+
+    def load_solution_cache(self):
+        from utils.solution_cache import SolutionCache
+        self.solution_cache = SolutionCache(path=os.path.join(self.user_data_dir, "solutions.sqlite3"))
+
+    def load_music(self):
+        self.audio.set_playlist(SONGS)
+        self.audio.set_music(self.music_state) # streamed, and only opened if the music is on
 
     def build_config(self, config):
         config.setdefaults(
@@ -608,6 +711,11 @@ class PuzzleApp(App):
                 "tile_movement": "0.15"
             }
         )
+        config.setdefaults(
+            "Game", {
+                "grid_size": "3x3"
+            }
+        )
 
     def build_settings(self, settings):
         settings.add_json_panel(
@@ -654,7 +762,7 @@ class PuzzleApp(App):
     def on_config_change(self, config, section, key, value):
         if key == "music": 
             self.music_state = int(value)
-            self.play_song()
+            self.audio.set_music(self.music_state)
 
         if key == "sound_effects":
             global sound_effects
@@ -667,21 +775,14 @@ class PuzzleApp(App):
         if key == "tile_movement":
             global tile_movement
             tile_movement = float(value.split(" ")[0])
-        
-    def play_song(self, *args):
-        if self.music_state:
-            if self.current >= len(self.songs) - 1:
-                self.current = 0
-            else:
-                self.current += 1
-            self.bg_songs[self.current].play()
-
-        else:
-            self.bg_songs[self.current].stop()
 
+        if key == "grid_size":
+            global grid_size
+            grid_size = int(value.split("x")[0])
+        
     def play_btn_sound(self):
-        if sound_effects: 
-            self.btn_sound.play()
+        if sound_effects:
+            self.audio.play(TILE_SOUND)
 
 
 async def main():
@@ -1,47 +1,166 @@
-from utils.constants import INFO_REPLACE
+from utils.constants import INFO_REPLACE, API_URL, CONNECT_TIMEOUT, READ_TIMEOUT, API_CACHE_TTLS, TELEMETRY_PATH
+from utils.response_cache import ResponseCache
+from utils.profiler import count, measure
+from typing import Awaitable, Callable
+import os
+import trio
 import requests
+from requests.adapters import HTTPAdapter
 
-def get_route(path: str) -> str:
+
+class ApiClient:
     """
-    Helper function to format URL
+    HTTP client for the game's API
+    Requests run in a worker thread (so trio and the UI keep running) over one keep-alive connection
+    Endpoints in API_CACHE_TTLS are served from the cache while fresh, then revalidated with ETag / If-Modified-Since
+    and served stale if the server cannot be reached
     """
-    return f"https://just-kitkat.github.io/api/slidingpuzzle/{path}"
 
-def get_news() -> str:
+    def __init__(self, base_url: str = None, connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 cache: ResponseCache = None):
+        self.base_url = (base_url or os.environ.get("SLIDINGPUZZLE_API_URL") or API_URL).rstrip("/") + "/"
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.limiter = trio.CapacityLimiter(1) # one request at a time on the pooled connection
+        self.cache = cache or ResponseCache()
+
+    def get_route(self, path: str) -> str:
+        """
+        Helper function to format URL
+        """
+        return self.base_url + path
+
+    def fetch(self, path: str) -> str:
+        """
+        Blocking GET, raises on network errors, timeouts and error statuses (unless there is a cached response)
+        """
+        ttl = API_CACHE_TTLS.get(path)
+        if ttl is None:
+            with measure(f"api.get.{path}"):
+                response = self.session.get(self.get_route(path), timeout=self.timeout)
+            response.raise_for_status()
+            return response.text
+
+        if self.cache.is_fresh(path, ttl):
+            count("api.cache_hits")
+            return self.cache.get(path)["body"]
+
+        cached = self.cache.get(path)
+        try:
+            with measure(f"api.get.{path}"):
+                response = self.session.get(self.get_route(path), timeout=self.timeout, headers=self.cache.validators(path))
+            if response.status_code == 304 and cached is not None:
+                count("api.not_modified")
+                self.cache.touch(path)
+                return cached["body"]
+            response.raise_for_status()
+        except requests.RequestException:
+            if cached is not None:
+                count("api.stale_hits")
+                return cached["body"] # offline, use the last good response
+            raise
+
+        self.cache.store(path, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.text
+
+    async def get(self, path: str) -> str:
+        """
+        GET without blocking the event loop. If the calling task is cancelled it returns straight away
+        (the request finishes in the background and is thrown away)
+        """
+        ttl = API_CACHE_TTLS.get(path)
+        if ttl is not None and self.cache.is_fresh(path, ttl):
+            count("api.cache_hits")
+            return self.cache.get(path)["body"] # no need for a thread
+        return await trio.to_thread.run_sync(self.fetch, path, cancellable=True, limiter=self.limiter)
+
+    def send(self, path: str, payload) -> None:
+        """
+        Blocking POST of a JSON payload, raises on network errors, timeouts and error statuses
+        """
+        with measure(f"api.post.{path}"):
+            response = self.session.post(self.get_route(path), json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    async def post(self, path: str, payload) -> None:
+        """
+        POST without blocking the event loop
+        """
+        await trio.to_thread.run_sync(self.send, path, payload, cancellable=True, limiter=self.limiter)
+
+    def close(self):
+        self.session.close()
+
+
+client = ApiClient()
+
+
+def configure(base_url: str = None, connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT):
+    """
+    Replace the shared client, e.g. to point the game at a local test server
+    """
+    global client
+    client.close()
+    client = ApiClient(base_url, connect_timeout, read_timeout, client.cache)
+
+
+def set_cache_path(path: str):
+    """
+    Persist cached responses to a file (called once the app knows its data directory)
+    """
+    client.cache.open(path)
+
+
+def start(nursery: trio.Nursery, request: Callable[[], Awaitable], callback: Callable = None):
+    """
+    Run one of the requests below in the background and pass its result to callback (if any)
+    e.g. start(inst.nursery, get_news, show_news)
+    """
+    async def run():
+        result = await request()
+        if callback is not None:
+            callback(result)
+
+    nursery.start_soon(run)
+
+
+async def get_news() -> str:
     """
     Return announcements e.g. new updates/features
     """
     try:
-        news = requests.get(get_route("news"))
-        return news.text
+        return await client.get("news")
     except Exception:
         return "News not available!\nAre you connected to the internet?"
 
-def join_game():
+async def send_events(events: list) -> bool:
     """
-    Called when user starts a game
-    Used to track how many games are played each day
+    Upload a batch of telemetry events, returns True if the server took them
     """
+    if TELEMETRY_PATH is None:
+        return False
     try:
-        requests.get(get_route("join_game"))
+        await client.post(TELEMETRY_PATH, events)
+        return True
     except Exception:
-        pass
+        return False
 
-def get_latest_version():
+async def get_latest_version() -> str | None:
     try:
-        news = requests.get(get_route("latest_version"))
-        return news.text
+        return await client.get("latest_version")
     except Exception:
         return None
 
-def get_info():
+async def get_info() -> dict:
     """
     Gets the credits info and parses it into a dict
     """
     data = {}
     try:
-        info = requests.get(get_route("info"))
-        info = info.text
+        info = await client.get("info")
         for i in info.split("\n"):
             i = i.split(": ")
             data[i[0]] = i[1] if i[1] not in INFO_REPLACE else INFO_REPLACE[i[1]]
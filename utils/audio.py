@@ -0,0 +1,153 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# All the game's sounds. Sound effects are loaded once per file and played from a small pool of voices
+# so quick taps overlap instead of cutting each other off, music is streamed one song at a time.
+# kivy.core.audio is only imported when the first sound is loaded (it picks the audio provider on import).
+
+from typing import List
+
+from utils.constants import SOUND_VOICES
+from utils.file_handler import resource_path
+
+from kivy.logger import Logger
+
+
+def load_sound(path: str):
+    from kivy.core.audio import SoundLoader
+    return SoundLoader.load(resource_path(path))
+
+
+def load_music(path: str):
+    """
+    Open a song without decoding it: SoundLoader picks SDL2's sound class for mp3s, which decodes
+    the whole file into memory, while its music class streams from disk
+    """
+    try:
+        from kivy.core.audio.audio_sdl2 import MusicSDL2
+    except ImportError: # other providers (android, gstreamer) stream already
+        return load_sound(path)
+    return MusicSDL2(source=resource_path(path))
+
+
+class SoundEffect:
+    """
+    One sound effect with up to max_voices copies, played round robin
+    The first copy is loaded by load(), the others only the first time every copy is busy
+    """
+
+    def __init__(self, path: str, max_voices: int = SOUND_VOICES):
+        self.path = path
+        self.max_voices = max_voices
+        self.voices = []
+        self.next = 0 # voice to try first
+
+    def add_voice(self):
+        sound = load_sound(self.path)
+        if sound is None:
+            Logger.warning(f"Audio: Could not load {self.path}")
+            self.max_voices = len(self.voices) # do not keep trying
+            return None
+        self.voices.append(sound)
+        return sound
+
+    def load(self):
+        if not self.voices:
+            self.add_voice()
+
+    def play(self):
+        for i in range(len(self.voices)):
+            voice = self.voices[(self.next + i) % len(self.voices)]
+            if voice.state != "play":
+                self.next = (self.next + i + 1) % len(self.voices)
+                break
+        else:
+            voice = self.add_voice() if len(self.voices) < self.max_voices else None
+            if voice is None: # every voice is busy, restart the one that started first
+                if not self.voices:
+                    return
+                voice = self.voices[self.next]
+                self.next = (self.next + 1) % len(self.voices)
+                voice.stop()
+        voice.play()
+
+
+class AudioManager:
+    """
+    Sound effects by path (see SoundEffect) and a playlist of background songs
+    Only the song that is playing is loaded, the next one is opened when it ends
+    """
+
+    def __init__(self, max_voices: int = SOUND_VOICES):
+        self.max_voices = max_voices
+        self.effects = {} # path -> SoundEffect
+        self.songs = []
+        self.current = 0
+        self.song = None
+        self.music_on = False
+
+    def effect(self, path: str) -> SoundEffect:
+        effect = self.effects.get(path)
+        if effect is None:
+            effect = self.effects[path] = SoundEffect(path, self.max_voices)
+        return effect
+
+    def preload(self, *paths: str):
+        """
+        Load the sound effects before they are first played
+        """
+        for path in paths:
+            self.effect(path).load()
+
+    def play(self, path: str):
+        self.effect(path).play()
+
+    def set_playlist(self, songs: List[str]):
+        self.songs = songs
+        self.current = 0
+
+    def set_music(self, on: bool):
+        """
+        Start or stop the background music, the first song is loaded when the music is first turned on
+        """
+        self.music_on = on
+        if not on:
+            if self.song is not None:
+                self.song.stop()
+        elif self.song is None or self.song.state != "play":
+            self.play_song()
+
+    def play_song(self):
+        if not self.songs:
+            return
+        path = self.songs[self.current]
+        if self.song is None or self.song.source != resource_path(path):
+            if self.song is not None:
+                self.song.unbind(on_stop=self.on_song_stop)
+                self.song.unload()
+            Logger.info(f"Audio: Loading {path}")
+            self.song = load_music(path)
+            if self.song is None:
+                return
+            self.song.bind(on_stop=self.on_song_stop)
+        self.song.play()
+
+    def on_song_stop(self, song):
+        if self.music_on: # it ended by itself, play the next one
+            self.current = (self.current + 1) % len(self.songs)
+            self.play_song()
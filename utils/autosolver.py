@@ -16,92 +16,498 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 """
 
-from typing import List
-from copy import deepcopy
-from itertools import chain
+from typing import List, Tuple
+from collections import deque
+from functools import lru_cache
+from heapq import heappush, heappop
 
-def solve(grid: List[List[int]]) -> [int, List[str]]:
+from utils import profiler
+from utils.solvability import solvable
+
+# A board is packed into one int, a few bits per cell (cell i is bits i*bits..), 0 is the empty tile.
+# Moves are 2 bit codes describing where the empty tile goes; code ^ 1 is the opposite move.
+UP, DOWN, LEFT, RIGHT = 0, 1, 2, 3
+MOVE_NAMES = ["up", "down", "left", "right"]
+MOVE_DELTAS = [(0, -1), (0, 1), (-1, 0), (1, 0)] # (dx, dy) of the empty tile
+NO_MOVE = -1
+
+# Longest optimal solution for each size (unknown sizes just get a large limit)
+MAX_MOVES = {2: 6, 3: 31, 4: 80}
+
+# "auto" tries an optimal IDA* for this many nodes on 4x4 boards (a few seconds),
+# then settles for a weighted A* solution. Bigger boards go straight to weighted A*.
+AUTO_NODE_BUDGET = 200_000
+WEIGHTS = {4: 2, 5: 5} # heuristic weight for weighted A* (tuned on random boards)
+# Nodes "auto" gives each weighted A* attempt, the weight doubles after each one that runs out
+AUTO_WEIGHTED_BUDGET = 1_000_000
+AUTO_WEIGHTED_TRIES = 3
+
+
+class Puzzle:
     """
-    Use BFS to get the optimal moves to solve the sliding puzzle
+    Lookup tables for one board size, use puzzle(size) to get a cached instance
     """
-    cache: str = {"placeholder"} # set of past grids
-    store: List[list] = [[[grid, [""], (None, None)]]] # [[[grid1,last_move,moves]], [[grid1_1,last_move,moves], [grid1_2,last_move,moves]]]
-    
-    def bfs(grid: List[List[int]], moves: List[str], x: int, y: int) -> [int, List[str], tuple[int | None]]:
+
+    def __init__(self, size: int):
+        self.size = size
+        self.cells = size * size
+        self.bits = max(4, (self.cells - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.max_moves = MAX_MOVES.get(size, 1000)
+        self.goal = [[y * size + x + 1 for x in range(size)] for y in range(size)]
+        self.goal[-1][-1] = -1
+        self.goal_state = self.pack(list(range(1, self.cells)) + [0])
+        self.pattern_db = None # additive pattern databases (see utils/pattern_db.py), used by heuristic() if set
+
+        # move_table[blank] = [(move, new_blank, shift of the tile that slides into blank), ...]
+        self.move_table: List[List[Tuple[int, int, int]]] = []
+        for blank in range(self.cells):
+            y, x = divmod(blank, size)
+            moves = []
+            for move, (dx, dy) in enumerate(MOVE_DELTAS):
+                if 0 <= x + dx < size and 0 <= y + dy < size:
+                    new_blank = (y + dy) * size + x + dx
+                    moves.append((move, new_blank, self.bits * new_blank))
+            self.move_table.append(moves)
+
+        # manhattan[tile][cell] = distance of tile from its goal cell
+        self.manhattan: List[List[int]] = [[0] * self.cells for _ in range(self.cells)]
+        for tile in range(1, self.cells):
+            gy, gx = divmod(tile - 1, size)
+            for cell in range(self.cells):
+                y, x = divmod(cell, size)
+                self.manhattan[tile][cell] = abs(y - gy) + abs(x - gx)
+
+    def pack(self, cells: List[int]) -> int:
         """
-        Breadth first search algorithm
+        Pack a flat list of tiles into a state int
         """
-        # Boundary condition (no solution found -> num_moves > 31)
-        if len(moves) > 31: # max moves is 31 (+ 1 empty string inserted)
-            return "not found"
-        
-        # Most efficient way i know to flatten a nested list of integers (i'm sorry)
-        grid_str: str = f"{grid[0][0]}{grid[0][1]}{grid[0][2]}{grid[1][0]}{grid[1][1]}{grid[1][2]}{grid[2][0]}{grid[2][1]}{grid[2][2]}"
-        if grid_str in cache:
-            return
-        else:
-            cache.add(grid_str)
-        
-        
-        # Locate empty tile (x and y)
-        if x is None: # check if finding the empty tile is needed (for first bfs layer)
-            for y, row in enumerate(grid):
-                for x, item in enumerate(row):
-                    if item == -1: break
-                if item == -1: break
-
-        # Remove previous moves from possible moves
-        opposite_move_list = ["up", "down", "up", "left", "right", "left"]
-        to_move = ["up", "down", "left", "right"]
-        last_move = moves[-1]
-
-        if last_move != "":
-            to_move.remove(opposite_move_list[opposite_move_list.index(last_move)+1])
-
-        # Move tile and store it(excluding the last_move)
-        original_coords = x, y
-        for move in to_move:
-            new_grid = deepcopy(grid)
-            x, y = original_coords
-            if move == "up" and y != 0:
-                new_grid[y][x], new_grid[y-1][x] = new_grid[y-1][x], new_grid[y][x]
-                y -= 1
-            elif move == "down" and y != 2:
-                new_grid[y][x], new_grid[y+1][x] = new_grid[y+1][x], new_grid[y][x]
-                y += 1
-            elif move == "left" and x != 0:
-                new_grid[y][x], new_grid[y][x-1] = new_grid[y][x-1], new_grid[y][x]
-                x -= 1
-            elif move == "right" and x != 2:
-                new_grid[y][x], new_grid[y][x+1] = new_grid[y][x+1], new_grid[y][x]
-                x += 1
-            else:
+        state = 0
+        for i, tile in enumerate(cells):
+            state |= tile << (self.bits * i)
+        return state
+
+    def unpack(self, state: int) -> List[int]:
+        """
+        Unpack a state int into a flat list of tiles
+        """
+        return [(state >> (self.bits * i)) & self.mask for i in range(self.cells)]
+
+    def to_state(self, grid: List[List[int]]) -> int:
+        """
+        Pack a grid into a state int (-1 becomes 0)
+        """
+        return self.pack([0 if item == -1 else item for row in grid for item in row])
+
+    def to_grid(self, state: int) -> List[List[int]]:
+        """
+        Unpack a state int into a grid (0 becomes -1)
+        """
+        cells = [-1 if tile == 0 else tile for tile in self.unpack(state)]
+        return [cells[i:i + self.size] for i in range(0, self.cells, self.size)]
+
+    def blank_of(self, state: int) -> int:
+        """
+        Index of the empty tile
+        """
+        for i in range(self.cells):
+            if not (state >> (self.bits * i)) & self.mask:
+                return i
+
+    def neighbours(self, state: int, blank: int, last_move: int = NO_MOVE):
+        """
+        Yield (move, new_state, new_blank) for every legal move, skipping the move that undoes last_move
+        """
+        blank_shift = self.bits * blank
+        for move, new_blank, shift in self.move_table[blank]:
+            if move ^ 1 == last_move:
                 continue
-            
-            store[-1].append([new_grid, moves + [move], (x, y)])
-            
-            if new_grid == [[1,2,3], [4,5,6], [7,8,-1]]: # func: check_win(grid); Check if new grid is correct ([[1,2,3], [4,5,6], [7,8,-1]])
-                return "found"
-
-    status = None
-    if store[0][0][0] == [[1,2,3], [4,5,6], [7,8,-1]]:
-        return store[0][0]
-    
-    while status is None:
-        store.append([])
-        for i in store[-2]:
-            status = bfs(i[0], i[1], i[2][0], i[2][1])
-            if status != None:
-                break
-
-    return store[-1][-1] if status == "found" else "not found"
+            tile = (state >> shift) & self.mask
+            yield move, state - (tile << shift) + (tile << blank_shift), new_blank
 
-"""
-# Used to test efficiency
-import time
-
-s=time.time()
-print(len(solve([[1,8,7],[4,2,-1],[5,3,6]])[-2] ))
-print(time.time()-s)
-#18742-1536
-"""
\ No newline at end of file
+    def move(self, state: int, blank: int, move: int) -> Tuple[int, int] | None:
+        """
+        Apply one move code, returns (new_state, new_blank) or None if the move is not possible
+        """
+        for code, new_blank, shift in self.move_table[blank]:
+            if code == move:
+                tile = (state >> shift) & self.mask
+                return state - (tile << shift) + (tile << (self.bits * blank)), new_blank
+        return None
+
+    def is_solvable(self, state: int) -> bool:
+        """
+        Inversion and empty tile row parity, see utils.solvability
+        """
+        return solvable(self.unpack(state), self.size)
+
+    def heuristic(self, state: int) -> int:
+        """
+        Admissible estimate of the moves left: additive pattern databases if loaded,
+        else Manhattan distance + linear conflicts
+        """
+        if self.pattern_db is not None:
+            return self.pattern_db.estimate(state)
+
+        size = self.size
+        distance = 0
+        rows = [[] for _ in range(size)]
+        cols = [[] for _ in range(size)]
+        for i in range(self.cells):
+            tile = (state >> (self.bits * i)) & self.mask
+            if tile == 0:
+                continue
+            distance += self.manhattan[tile][i]
+            y, x = divmod(i, size)
+            gy, gx = divmod(tile - 1, size)
+            if y == gy:
+                rows[y].append(gx)
+            if x == gx:
+                cols[x].append(gy)
+
+        conflicts = sum(_line_conflicts(line) for line in rows) + sum(_line_conflicts(line) for line in cols)
+        return distance + 2 * conflicts
+
+
+@lru_cache(maxsize=None)
+def puzzle(size: int) -> Puzzle:
+    return Puzzle(size)
+
+
+def _line_conflicts(tiles: List[int]) -> int:
+    """
+    Minimum number of tiles that must leave a line so the rest are in goal order
+    (tiles is the list of goal indices, in current order, of tiles that belong in this line)
+    """
+    if len(tiles) < 2:
+        return 0
+    # longest increasing subsequence (lines are short so O(n^2) is fine)
+    best = [1] * len(tiles)
+    for i in range(len(tiles)):
+        for j in range(i):
+            if tiles[j] < tiles[i] and best[j] + 1 > best[i]:
+                best[i] = best[j] + 1
+    return len(tiles) - max(best)
+
+
+class SolveCancelled(Exception):
+    """
+    Raised inside a search when its SolveProgress gets cancelled
+    """
+
+
+class SolveBudgetExceeded(SolveCancelled):
+    """
+    Raised inside a search when it expands more nodes than SolveProgress.budget
+    """
+
+
+class SolveProgress:
+    """
+    Shared between a running search and whoever started it (usually another thread).
+    The search updates nodes/depth, the caller reads them and can cancel the search.
+    """
+
+    CHECK_EVERY = 1024 # nodes between cancellation/budget checks
+
+    def __init__(self, budget: int = None):
+        self.nodes = 0
+        self.depth = 0
+        self.cancelled = False
+        self.budget = budget
+        self.optimal = True # set to False when solve() settles for a non optimal solution
+
+    def cancel(self):
+        self.cancelled = True
+
+    def expand(self, depth: int):
+        """
+        Called by the searches for every expanded node
+        """
+        self.nodes += 1
+        self.depth = depth
+        if not self.nodes % self.CHECK_EVERY:
+            if self.cancelled:
+                raise SolveCancelled
+            if self.budget is not None and self.nodes >= self.budget:
+                raise SolveBudgetExceeded
+
+
+def _trace(came_from: dict, state: int) -> List[str]:
+    """
+    Rebuild the path to state from parent links (came_from[child] = parent << 2 | move)
+    """
+    moves = []
+    link = came_from[state]
+    while link != NO_MOVE:
+        moves.append(MOVE_NAMES[link & 3])
+        link = came_from[link >> 2]
+    return moves[::-1]
+
+
+def astar(board: Puzzle, state: int, progress: SolveProgress, weight: int = 1) -> List[str] | None:
+    """
+    A* search, returns the optimal list of moves or None
+    With weight > 1 the heuristic is inflated: much faster, but the moves are no longer optimal
+    """
+    heuristic = board.heuristic
+    limit = board.max_moves + 1 if weight == 1 else float("inf") # weighted solutions can be longer than any optimal one
+    came_from = {state: NO_MOVE}
+    best_g = {state: 0}
+    frontier = [(weight * heuristic(state), 0, state, board.blank_of(state))] # (f, -g, ...) so ties go to the deepest node
+
+    while frontier:
+        f, g, current, blank = heappop(frontier)
+        g = -g
+        if current == board.goal_state:
+            return _trace(came_from, current)
+
+        if g > best_g[current]: # stale heap entry
+            continue
+
+        progress.expand(g)
+        link = came_from[current]
+        last_move = NO_MOVE if link == NO_MOVE else link & 3
+        for move, child, child_blank in board.neighbours(current, blank, last_move):
+            if g + 1 < best_g.get(child, limit):
+                best_g[child] = g + 1
+                came_from[child] = current << 2 | move
+                heappush(frontier, (g + 1 + weight * heuristic(child), -g - 1, child, child_blank))
+
+    return None
+
+
+def idastar(board: Puzzle, state: int, progress: SolveProgress) -> List[str] | None:
+    """
+    Iterative deepening A*, returns the optimal list of moves or None
+    Uses almost no memory (only the current path of move codes is stored)
+    With pattern databases the heuristic is updated incrementally (only the moved tile's pattern changes)
+    """
+    heuristic = board.heuristic
+    move_table, bits, mask = board.move_table, board.bits, board.mask
+    pattern_db = board.pattern_db
+    if pattern_db is not None:
+        indexes = pattern_db.indexes(state)
+        tables, slot_of = pattern_db.tables, pattern_db.slot_of
+    path: List[int] = []
+    bound = start_h = heuristic(state)
+    not_found = board.max_moves + 1
+
+    def search(state: int, blank: int, g: int, h: int, last_move: int) -> int:
+        """
+        Returns -1 if the goal is found, else the smallest f that exceeded the bound
+        """
+        f = g + h
+        if f > bound:
+            return f
+        if h == 0:
+            return -1
+
+        progress.expand(bound)
+        minimum = not_found
+        blank_shift = bits * blank
+        for move, new_blank, shift in move_table[blank]:
+            if move ^ 1 == last_move:
+                continue
+            tile = (state >> shift) & mask
+            child = state - (tile << shift) + (tile << blank_shift)
+            path.append(move)
+            if pattern_db is None:
+                t = search(child, new_blank, g + 1, heuristic(child), move)
+            else:
+                pattern, slot_shift = slot_of[tile]
+                index = indexes[pattern]
+                child_index = index - (new_blank << slot_shift) + (blank << slot_shift)
+                table = tables[pattern]
+                indexes[pattern] = child_index
+                t = search(child, new_blank, g + 1, h - table[index] + table[child_index], move)
+                indexes[pattern] = index
+            if t == -1:
+                return -1
+            if t < minimum:
+                minimum = t
+            path.pop()
+        return minimum
+
+    while bound <= board.max_moves:
+        t = search(state, board.blank_of(state), 0, start_h, NO_MOVE)
+        if t == -1:
+            return [MOVE_NAMES[move] for move in path]
+        bound = t
+
+    return None
+
+
+def bfs(board: Puzzle, state: int, progress: SolveProgress) -> List[str] | None:
+    """
+    Plain breadth first search (kept for comparison with the informed searches)
+    """
+    came_from = {state: NO_MOVE}
+    queue = deque([(state, board.blank_of(state), 0)])
+    while queue:
+        current, blank, depth = queue.popleft()
+        if current == board.goal_state:
+            return _trace(came_from, current)
+
+        progress.expand(depth)
+        for move, child, child_blank in board.neighbours(current, blank):
+            if child not in came_from:
+                came_from[child] = current << 2 | move
+                queue.append((child, child_blank, depth + 1))
+
+    return None
+
+
+def bidirectional(board: Puzzle, state: int, progress: SolveProgress) -> List[str] | None:
+    """
+    Breadth first search from both the board and the goal, always expanding the smaller frontier.
+    Stops at the end of the first layer where the two searches meet (visits ~2*b^(d/2) states instead of b^d)
+    """
+    if state == board.goal_state:
+        return []
+
+    forward = {state: NO_MOVE}
+    backward = {board.goal_state: NO_MOVE}
+    forward_frontier = [(state, board.blank_of(state))]
+    backward_frontier = [(board.goal_state, board.blank_of(board.goal_state))]
+    depth = 0
+
+    while forward_frontier and backward_frontier:
+        expand_forward = len(forward_frontier) <= len(backward_frontier)
+        visited, other = (forward, backward) if expand_forward else (backward, forward)
+        frontier = forward_frontier if expand_forward else backward_frontier
+
+        next_frontier = []
+        best = None
+        for current, blank in frontier:
+            progress.expand(depth)
+            link = visited[current]
+            last_move = NO_MOVE if link == NO_MOVE else link & 3
+            for move, child, child_blank in board.neighbours(current, blank, last_move):
+                if child in visited:
+                    continue
+                visited[child] = current << 2 | move
+                if child in other:
+                    length = len(_trace(other, child))
+                    if best is None or length < best[0]:
+                        best = (length, child)
+                next_frontier.append((child, child_blank))
+
+        if best is not None:
+            meeting = best[1]
+            # the backward half was found from the goal, so reverse it
+            to_goal = [MOVE_NAMES[MOVE_NAMES.index(move) ^ 1] for move in _trace(backward, meeting)[::-1]]
+            return _trace(forward, meeting) + to_goal
+
+        depth += 1
+        if expand_forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None
+
+
+def table(board: Puzzle, state: int, progress: SolveProgress) -> List[str] | None:
+    """
+    Greedy descent through the precomputed 3x3 distance table (see utils/distance_table.py)
+    """
+    from utils.distance_table import descend
+    return descend(state)
+
+
+def weighted(board: Puzzle, state: int, progress: SolveProgress, weight: int = None) -> List[str] | None:
+    """
+    Weighted A*, for boards too big to solve optimally in a few seconds
+    """
+    return astar(board, state, progress, weight=weight or WEIGHTS.get(board.size, 5))
+
+
+STRATEGIES = {
+    "table": table,
+    "astar": astar,
+    "idastar": idastar,
+    "bfs": bfs,
+    "bidirectional": bidirectional,
+    "weighted": weighted,
+}
+
+
+def pick_strategy(size: int) -> str:
+    """
+    Best strategy for a board size: the distance table for 3x3 (if built),
+    IDA* up to 4x4 and weighted A* for anything bigger
+    """
+    if size == 3:
+        from utils.distance_table import load
+        if load() is not None:
+            return "table"
+    return "idastar" if size <= 4 else "weighted"
+
+
+@profiler.timed("solve")
+def solve(grid: List[List[int]], strategy: str = "auto", progress: SolveProgress = None, cache=None) -> [List[List[int]], List[str], Tuple[int, int]]:
+    """
+    Get the moves to solve the sliding puzzle (any N x N grid)
+    Every strategy except "weighted" gives an optimal solution; "auto" may fall back to "weighted" on boards bigger than 3x3
+    Optimal solutions are looked up in / stored to cache (a utils.solution_cache.SolutionCache) if given
+    Returns [solved_grid, ["", *moves], (x, y) of the empty tile] or "not found"
+    Raises SolveCancelled if progress gets cancelled while searching
+    """
+    if progress is None:
+        progress = SolveProgress()
+
+    board = puzzle(len(grid))
+    state = board.to_state(grid)
+    if not board.is_solvable(state):
+        return "not found"
+
+    moves = None if cache is None else cache.get(board.size, state)
+    if moves is not None:
+        profiler.count("solve.cache_hits")
+        return [[row[:] for row in board.goal], [""] + moves, (board.size - 1, board.size - 1)]
+
+    auto = strategy == "auto"
+    if auto or (strategy == "table" and board.size != 3):
+        strategy = pick_strategy(board.size)
+    elif strategy == "table" and pick_strategy(3) != "table": # table not built, search instead
+        strategy = "idastar"
+
+    if strategy in ("astar", "idastar", "weighted") and board.size == 4 and board.pattern_db is None:
+        from utils.pattern_db import load_pattern_db
+        board.pattern_db = load_pattern_db(board)
+
+    if auto and strategy == "idastar" and board.size > 3:
+        budget = progress.budget
+        progress.budget = progress.nodes + AUTO_NODE_BUDGET
+        try:
+            moves = idastar(board, state, progress)
+        except SolveBudgetExceeded:
+            moves = None
+        if moves is None: # too slow to solve optimally
+            weight = WEIGHTS.get(board.size, 5)
+            for _ in range(AUTO_WEIGHTED_TRIES):
+                progress.budget = progress.nodes + AUTO_WEIGHTED_BUDGET
+                try:
+                    moves = weighted(board, state, progress, weight)
+                    break
+                except SolveBudgetExceeded:
+                    weight *= 2 # greedier: longer moves, far fewer nodes
+            progress.optimal = False
+        progress.budget = budget
+    else:
+        moves = STRATEGIES[strategy](board, state, progress)
+        progress.optimal = strategy != "weighted"
+
+    if moves is not None and cache is not None and progress.optimal:
+        cache.put(board.size, state, moves)
+
+    if profiler.enabled:
+        label = f"solve.{board.size}x{board.size}.{strategy if progress.optimal else 'weighted'}"
+        profiler.count(f"{label}.nodes", progress.nodes)
+        profiler.count(f"{label}.solves")
+
+    if moves is None:
+        return "not found"
+
+    return [[row[:] for row in board.goal], [""] + moves, (board.size - 1, board.size - 1)]
@@ -0,0 +1,213 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# Solve lots of puzzles at once (used offline to validate and rate generated puzzle sets).
+#
+# Usage: python -m utils.batch puzzles.txt -o solutions.jsonl [--workers N] [--unordered]
+# Every line of the input is one board, row by row, e.g. "8 6 7 2 5 4 3 0 1" (0 or -1 is the empty tile)
+
+from typing import Iterable, Iterator, List, Tuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from math import isqrt
+import json
+import os
+
+from utils.autosolver import solve, puzzle, SolveProgress
+from utils.solution_cache import SolutionCache
+
+CHUNK_SIZE = 64 # boards sent to a worker at once
+CHUNKS_PER_WORKER = 2 # chunks in flight per worker, so workers never wait for input
+
+
+def board_key(grid: List[List[int]]) -> Tuple[int, int]:
+    """
+    Canonical encoding of a board: (size, packed state)
+    """
+    return len(grid), puzzle(len(grid)).to_state(grid)
+
+
+def _solve_one(grid: List[List[int]], strategy: str) -> Tuple[list, bool]:
+    """
+    Returns (result of solve(), whether the solution is optimal)
+    """
+    progress = SolveProgress()
+    return solve(grid, strategy, progress), progress.optimal
+
+
+def _solve_chunk(grids: List[List[List[int]]], strategy: str) -> list:
+    """
+    Worker for solve_many(), runs in another process
+    """
+    return [_solve_one(grid, strategy) for grid in grids]
+
+
+def _lookup(cache: SolutionCache | None, key: Tuple[int, int]) -> list | None:
+    """
+    solve() style result from the cache or None
+    """
+    if cache is None:
+        return None
+    moves = cache.get(*key)
+    if moves is None:
+        return None
+    board = puzzle(key[0])
+    return [[row[:] for row in board.goal], [""] + moves, (board.size - 1, board.size - 1)]
+
+
+def _store(cache: SolutionCache | None, key: Tuple[int, int], result: list, optimal: bool):
+    if cache is not None and optimal and result != "not found":
+        cache.put(*key, result[1][1:])
+
+
+def solve_many(grids: Iterable[List[List[int]]], workers: int = None, ordered: bool = True,
+               strategy: str = "auto", chunk_size: int = CHUNK_SIZE,
+               cache: SolutionCache = None) -> Iterator[Tuple[int, List[List[int]], list]]:
+    """
+    Solve many boards with a process pool, yielding (index, grid, result) where result is what solve() returns.
+    The input is read lazily in chunks and identical boards are only solved once.
+    ordered=True yields in input order, otherwise results come out as soon as they are ready.
+    workers=1 solves everything in this process.
+    If a cache is given, known boards are not sent to the workers and new optimal solutions are stored in it.
+    """
+    grids = iter(grids)
+    if workers == 1:
+        done = {}
+        for index, grid in enumerate(grids):
+            key = board_key(grid)
+            if key not in done:
+                done[key] = _lookup(cache, key)
+                if done[key] is None:
+                    done[key], optimal = _solve_one(grid, strategy)
+                    _store(cache, key, done[key], optimal)
+            yield index, grid, done[key]
+        return
+
+    workers = workers or os.cpu_count() or 1
+    done = {} # key -> result
+    waiting = {} # key -> [(index, grid), ...] waiting for an in-flight job
+    chunk_keys = {} # future -> keys of its boards
+    ready = {} # index -> (grid, result), finished but not yielded yet
+    next_index = 0 # next index to yield
+    count = 0
+    exhausted = False
+
+    with ProcessPoolExecutor(workers) as pool:
+        while True:
+            # Keep the pool busy
+            while not exhausted and len(chunk_keys) < workers * CHUNKS_PER_WORKER:
+                keys, chunk = [], []
+                while len(chunk) < chunk_size:
+                    grid = next(grids, None)
+                    if grid is None:
+                        exhausted = True
+                        break
+                    key = board_key(grid)
+                    if key not in done and key not in waiting:
+                        cached = _lookup(cache, key)
+                        if cached is not None:
+                            done[key] = cached
+                    if key in done:
+                        ready[count] = (grid, done[key])
+                    elif key in waiting:
+                        waiting[key].append((count, grid))
+                    else:
+                        waiting[key] = [(count, grid)]
+                        keys.append(key)
+                        chunk.append(grid)
+                    count += 1
+                if not chunk: # only duplicates so far, yield them first
+                    break
+                chunk_keys[pool.submit(_solve_chunk, chunk, strategy)] = keys
+
+            # Hand out everything that can be yielded
+            if ordered:
+                while next_index in ready:
+                    grid, result = ready.pop(next_index)
+                    yield next_index, grid, result
+                    next_index += 1
+            else:
+                for index in sorted(ready):
+                    grid, result = ready.pop(index)
+                    yield index, grid, result
+
+            if not chunk_keys:
+                if exhausted:
+                    break
+                continue
+
+            finished, _ = wait(chunk_keys, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for key, (result, optimal) in zip(chunk_keys.pop(future), future.result()):
+                    _store(cache, key, result, optimal)
+                    done[key] = result
+                    for index, grid in waiting.pop(key):
+                        ready[index] = (grid, result)
+
+
+def parse_board(line: str) -> List[List[int]] | None:
+    """
+    "8 6 7 2 5 4 3 0 1" (or comma separated) -> [[8, 6, 7], [2, 5, 4], [3, -1, 1]]
+    Returns None for blank lines and # comments
+    """
+    line = line.split("#")[0].replace(",", " ").strip()
+    if not line:
+        return None
+    cells = [-1 if int(item) in (0, -1) else int(item) for item in line.split()]
+    size = isqrt(len(cells))
+    if size * size != len(cells) or sorted(cells) != [-1] + list(range(1, len(cells))):
+        raise ValueError(f"not a square board: {line!r}")
+    return [cells[i:i + size] for i in range(0, len(cells), size)]
+
+
+def read_boards(path: str) -> Iterator[List[List[int]]]:
+    with open(path) as f:
+        for line in f:
+            board = parse_board(line)
+            if board is not None:
+                yield board
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description="Solve a file of puzzles (one per line) and write JSONL")
+    parser.add_argument("input", help="puzzle file, one board per line")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="processes to solve with (default: all cores)")
+    parser.add_argument("--strategy", default="auto")
+    parser.add_argument("--unordered", action="store_true", help="write results as they finish instead of in input order")
+    parser.add_argument("--cache", default=None, help="sqlite file to reuse solutions from earlier runs")
+    args = parser.parse_args()
+    cache = None if args.cache is None else SolutionCache(path=args.cache)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    start_time = time.time()
+    solved = 0
+    for index, grid, result in solve_many(read_boards(args.input), args.workers, not args.unordered, args.strategy, cache=cache):
+        moves = None if result == "not found" else result[1][1:]
+        out.write(json.dumps({"index": index, "board": grid, "length": None if moves is None else len(moves), "moves": moves}) + "\n")
+        solved += 1
+
+    if out is not sys.stdout:
+        out.close()
+    print(f"Solved {solved} boards in {round(time.time() - start_time, 2)}s", file=sys.stderr)
+    if cache is not None:
+        print(f"Cache: {cache.stats()}", file=sys.stderr)
+        cache.close()
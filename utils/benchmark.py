@@ -0,0 +1,203 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# Solver benchmarks on fixed, seeded 3x3 corpora bucketed by optimal solution length.
+# The last bucket is every 31 move position (the hardest there are).
+#
+# Usage:
+#   python -m utils.benchmark -o results.json [--strategies table,idastar,astar,bidirectional] [--per-bucket 20]
+#   python -m utils.benchmark --baseline results.json [--threshold 0.25]   (exit code 1 on a regression)
+#
+# Every board is timed --repeat times (the fastest run counts), then solved once more under tracemalloc for the peak memory.
+
+from typing import Dict, List, Tuple
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+
+from utils.autosolver import solve, SolveProgress
+from utils import generator, distance_table
+
+# (label, min moves, max moves), boards are drawn uniformly from each range
+BUCKETS = [
+    ("0-7", 0, 7),
+    ("8-15", 8, 15),
+    ("16-23", 16, 23),
+    ("24-27", 24, 27),
+    ("28-30", 28, 30),
+    ("31", 31, 31),
+]
+HARDEST = 31
+DEFAULT_STRATEGIES = ["table", "idastar", "astar", "bidirectional"] # bfs takes about a minute per 31 move board
+# Metrics checked against a baseline -> smallest increase that counts (timer noise on fast solves)
+COMPARED = {"p95_ms": 1.0, "nodes": 0, "peak_kb": 1.0}
+
+
+def corpus(per_bucket: int, seed: int) -> List[Tuple[str, int, List[List[int]]]]:
+    """
+    [(bucket label, optimal length, grid), ...], the same for the same arguments
+    """
+    rng = random.Random(seed)
+    boards = []
+    for label, low, high in BUCKETS:
+        if low == high == HARDEST:
+            picks = generator.every(HARDEST) # all of them, not a sample
+        else:
+            picks = [generator.generate(low, high, rng) for _ in range(per_bucket)]
+        for grid in picks:
+            depth = distance_table.distance(distance_table.BOARD.to_state(grid))
+            boards.append((label, depth, grid))
+    return boards
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    Nearest rank percentile
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered) + 0.5) - 1))]
+
+
+def summarise(samples: List[dict]) -> dict:
+    times = [sample["ms"] for sample in samples]
+    return {
+        "solves": len(samples),
+        "wall_s": round(sum(times) / 1000, 4),
+        "nodes": sum(sample["nodes"] for sample in samples),
+        "peak_kb": round(max(sample["peak_kb"] for sample in samples), 1),
+        "p50_ms": round(percentile(times, 50), 3),
+        "p95_ms": round(percentile(times, 95), 3),
+        "p99_ms": round(percentile(times, 99), 3),
+        "wrong_length": sum(sample["length"] != sample["depth"] for sample in samples),
+    }
+
+
+def run_strategy(strategy: str, boards: list, repeat: int = 3) -> dict:
+    """
+    Solve every board with one strategy, returns the summary for the strategy and for each bucket
+    Each board's time is the best of repeat runs, which keeps scheduler noise out of the percentiles
+    """
+    solve([row[:] for row in boards[0][2]], strategy) # warm up (loads tables, fills the puzzle cache)
+
+    samples = []
+    for label, depth, grid in boards:
+        best = None
+        for _ in range(repeat):
+            progress = SolveProgress()
+            start_time = time.perf_counter()
+            result = solve([row[:] for row in grid], strategy, progress)
+            elapsed = time.perf_counter() - start_time
+            best = elapsed if best is None else min(best, elapsed)
+        samples.append({"bucket": label, "depth": depth, "ms": best * 1000, "nodes": progress.nodes,
+                        "length": len(result[1]) - 1})
+
+    tracemalloc.start()
+    for sample, (_, _, grid) in zip(samples, boards):
+        tracemalloc.reset_peak()
+        solve([row[:] for row in grid], strategy)
+        sample["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+
+    summary = summarise(samples)
+    summary["buckets"] = {
+        label: summarise([sample for sample in samples if sample["bucket"] == label])
+        for label, _, _ in BUCKETS
+    }
+    return summary
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    Metrics that got worse than the baseline by more than threshold (0.25 = 25%)
+    """
+    regressions = []
+    for strategy, summary in results["strategies"].items():
+        old = baseline.get("strategies", {}).get(strategy)
+        if old is None:
+            continue
+        for scope, new_values, old_values in [("all", summary, old)] + [
+            (label, summary["buckets"][label], old["buckets"][label])
+            for label in summary["buckets"] if label in old.get("buckets", {})
+        ]:
+            for metric, noise in COMPARED.items():
+                if new_values[metric] > old_values[metric] * (1 + threshold) and new_values[metric] - old_values[metric] > noise:
+                    regressions.append(f"{strategy} [{scope}] {metric}: {old_values[metric]} -> {new_values[metric]}")
+        if summary["wrong_length"]:
+            regressions.append(f"{strategy}: {summary['wrong_length']} solutions are not optimal")
+    return regressions
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(strategies: List[str], per_bucket: int, seed: int, repeat: int = 3) -> Dict:
+    boards = corpus(per_bucket, seed)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "per_bucket": per_bucket,
+            "repeat": repeat,
+            "boards": len(boards),
+        },
+        "strategies": {strategy: run_strategy(strategy, boards, repeat) for strategy in strategies},
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmark the solver strategies on fixed 3x3 corpora")
+    parser.add_argument("-o", "--output", default="-", help="JSON output file (default: stdout)")
+    parser.add_argument("--strategies", default=",".join(DEFAULT_STRATEGIES))
+    parser.add_argument("--per-bucket", type=int, default=20, help="boards per distance bucket (the 31 move bucket is always complete)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per board, the fastest counts")
+    parser.add_argument("--baseline", default=None, help="earlier results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown against the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = run(args.strategies.split(","), args.per_bucket, args.seed, args.repeat)
+    text = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+    for strategy, summary in results["strategies"].items():
+        print(f"{strategy:>14}: p50 {summary['p50_ms']}ms  p95 {summary['p95_ms']}ms  p99 {summary['p99_ms']}ms  "
+              f"{summary['nodes']} nodes  peak {summary['peak_kb']}KB", file=sys.stderr)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            raise SystemExit(1)
@@ -0,0 +1,82 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+from typing import List, Tuple
+
+# Direction the empty tile moves -> (dy, dx)
+MOVES = {"up": (-1, 0), "down": (1, 0), "left": (0, -1), "right": (0, 1)}
+
+Cell = Tuple[int, int] # (y, x)
+
+
+class Board:
+    """
+    An N x N game board (-1 is the empty tile) that keeps the cell of every tile indexed,
+    so finding a tile, making a move and checking for a win are all constant time
+    """
+
+    def __init__(self, grid: List[List[int]], goal: List[List[int]]):
+        self.size = len(grid)
+        self.grid = grid
+        self.goal = goal
+        self.cell_of = {tile: (y, x) for y, row in enumerate(grid) for x, tile in enumerate(row)}
+        self.misplaced = sum(
+            grid[y][x] != goal[y][x] for y in range(self.size) for x in range(self.size)
+        )
+
+    @property
+    def blank(self) -> Cell:
+        return self.cell_of[-1]
+
+    def tile_at(self, cell: Cell) -> int:
+        return self.grid[cell[0]][cell[1]]
+
+    def move(self, move: str) -> Tuple[Cell, Cell] | None:
+        """
+        Move the empty tile in the given direction
+        Returns the two cells that changed: (cell the tile moved to, cell the tile came from / the new blank)
+        or None if the move would leave the board
+        """
+        y, x = self.cell_of[-1]
+        dy, dx = MOVES[move]
+        ny, nx = y + dy, x + dx
+        if not (0 <= ny < self.size and 0 <= nx < self.size):
+            return None
+
+        grid, goal = self.grid, self.goal
+        tile = grid[ny][nx]
+        self.misplaced -= (grid[y][x] != goal[y][x]) + (tile != goal[ny][nx])
+        grid[y][x], grid[ny][nx] = tile, -1
+        self.misplaced += (tile != goal[y][x]) + (goal[ny][nx] != -1)
+        self.cell_of[tile] = (y, x)
+        self.cell_of[-1] = (ny, nx)
+        return (y, x), (ny, nx)
+
+    def move_towards(self, cell: Cell) -> str | None:
+        """
+        The move that slides the tile at cell into the empty space, or None if they are not next to each other
+        """
+        by, bx = self.cell_of[-1]
+        offset = (cell[0] - by, cell[1] - bx)
+        for move, delta in MOVES.items():
+            if delta == offset:
+                return move
+        return None
+
+    def solved(self) -> bool:
+        return self.misplaced == 0
@@ -3,7 +3,34 @@ VERSION = "1.0.0"
 # Sizes
 FRAME_SIZE_MULT = 1.265
 
+# Animation
+SPRITE_POOL_SIZE = 4 # slide animations that can run at once before the pool grows
+
+# Audio
+TILE_SOUND = "sound_effects/tile_sliding.wav" # tile slides and buttons
+SONGS = ["music/piano1.mp3"] # background music, played in order
+SOUND_VOICES = 4 # copies of a sound effect that can play over each other
+
 # Info Screen
 INFO_REPLACE = {
     "%{VERSION}%": VERSION
-}
\ No newline at end of file
+}
+
+# API (the URL can be pointed at a local server with the SLIDINGPUZZLE_API_URL environment variable)
+API_URL = "https://just-kitkat.github.io/api/slidingpuzzle/"
+CONNECT_TIMEOUT = 3.05 # seconds
+READ_TIMEOUT = 10 # seconds
+VERSION_CHECK_TTL = 6 * 60 * 60 # seconds between checks for a new version
+# Seconds a cached API response is used before asking the server again (uncached endpoints are not listed)
+API_CACHE_TTLS = {
+    "news": 60 * 60,
+    "info": 24 * 60 * 60,
+    "latest_version": 60 * 60,
+}
+
+# Telemetry
+TELEMETRY_PATH = None # API endpoint that takes a JSON list of events, None keeps them in the journal only (no server support yet)
+TELEMETRY_MAX_EVENTS = 1000 # oldest events are dropped past this
+TELEMETRY_BATCH_SIZE = 200 # events per POST
+TELEMETRY_FLUSH_INTERVAL = 60 # seconds between flushes
+TELEMETRY_MAX_BACKOFF = 60 * 60 # seconds, longest wait after failed flushes
@@ -0,0 +1,173 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# Optimal distance of every solvable 3x3 board, indexed by a permutation rank.
+# Build it with: python -m utils.distance_table
+
+from typing import List
+from collections import deque
+from math import factorial
+import mmap
+import os
+
+from utils.file_handler import resource_path
+from utils.autosolver import MOVE_NAMES, NO_MOVE, puzzle
+
+TABLE_PATH = "data/distances_3x3.bin"
+HALF_TILE_PERMS = factorial(8) // 2 # only even tile orders are solvable
+TABLE_SIZE = 9 * HALF_TILE_PERMS # 181440
+UNKNOWN = 0xFF
+
+_FACTORIALS = [factorial(i) for i in range(8)][::-1] # 7!, 6!, ..., 0!
+
+BOARD = puzzle(3)
+
+_table = None
+
+
+def rank(state: int) -> int:
+    """
+    Index of a solvable state in the table: blank position * 8!/2 + Lehmer rank of the tile order // 2
+    Swapping the last two tiles only changes the lowest Lehmer digit and flips the parity,
+    so halving the rank maps the even tile orders onto 0..8!/2-1 without gaps.
+    """
+    cells = BOARD.unpack(state)
+    blank = cells.index(0)
+    tiles = [tile for tile in cells if tile != 0]
+    lehmer = 0
+    for i, tile in enumerate(tiles):
+        smaller = 0
+        for later in tiles[i + 1:]:
+            if later < tile:
+                smaller += 1
+        lehmer += smaller * _FACTORIALS[i]
+    return blank * HALF_TILE_PERMS + lehmer // 2
+
+
+def unrank(index: int) -> int:
+    """
+    Inverse of rank(): the state stored at an index of the table
+    """
+    blank, half = divmod(index, HALF_TILE_PERMS)
+    for lehmer in (half * 2, half * 2 + 1): # the one with an even number of inversions
+        digits = []
+        for place in _FACTORIALS:
+            digit, lehmer = divmod(lehmer, place)
+            digits.append(digit)
+        if sum(digits) % 2 == 0:
+            break
+
+    remaining = list(range(1, 9))
+    cells = [remaining.pop(digit) for digit in digits]
+    cells.insert(blank, 0)
+    return BOARD.pack(cells)
+
+
+def build() -> bytearray:
+    """
+    Retrograde BFS from the goal, storing the distance of every reachable state
+    """
+    table = bytearray([UNKNOWN]) * TABLE_SIZE
+    table[rank(BOARD.goal_state)] = 0
+    queue = deque([(BOARD.goal_state, BOARD.blank_of(BOARD.goal_state), 0)])
+    while queue:
+        state, blank, depth = queue.popleft()
+        for _, child, child_blank in BOARD.neighbours(state, blank):
+            index = rank(child)
+            if table[index] == UNKNOWN:
+                table[index] = depth + 1
+                queue.append((child, child_blank, depth + 1))
+
+    return table
+
+
+def save(table: bytearray, path: str = TABLE_PATH):
+    """
+    Write the table to disk as raw bytes (one byte per state)
+    """
+    path = resource_path(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(table)
+
+
+def load(path: str = TABLE_PATH):
+    """
+    Memory map the table (read only, nothing is copied into python objects)
+    Returns None if the table has not been built
+    """
+    global _table
+    if _table is not None:
+        return _table
+
+    try:
+        with open(resource_path(path), "rb") as f:
+            table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(table) != TABLE_SIZE:
+        table.close()
+        return None
+
+    _table = table
+    return _table
+
+
+def distance(state: int) -> int | None:
+    """
+    Optimal number of moves to solve the state (None if the table is missing)
+    """
+    table = load()
+    if table is None:
+        return None
+    return table[rank(state)]
+
+
+def descend(state: int) -> List[str] | None:
+    """
+    Follow the table downhill to the goal, one lookup per neighbour
+    """
+    table = load()
+    if table is None:
+        return None
+
+    moves = []
+    blank = BOARD.blank_of(state)
+    depth = table[rank(state)]
+    last_move = NO_MOVE
+    while depth > 0:
+        for move, child, child_blank in BOARD.neighbours(state, blank, last_move):
+            if table[rank(child)] == depth - 1:
+                break
+        else:
+            return None # corrupt table
+        moves.append(MOVE_NAMES[move])
+        state, blank, last_move = child, child_blank, move
+        depth -= 1
+
+    return moves
+
+
+if __name__ == "__main__":
+    import time
+
+    start_time = time.time()
+    table = build()
+    save(table)
+    print(f"Built {TABLE_SIZE} states in {round(time.time() - start_time, 2)}s (max depth {max(table)})")
@@ -0,0 +1,100 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# The rules of the game without any Kivy, GameWindow is only a view over this
+
+from typing import List, Tuple
+import random
+
+from utils.autosolver import puzzle
+from utils.board import Board, Cell
+from utils.solvability import is_solvable
+
+
+def random_grid(size: int, rng: random.Random = random) -> Tuple[List[List[int]], int]:
+    """
+    A random solvable N x N grid, returns (grid, number of tries)
+    """
+    n = size
+    count = 1
+    while True:
+        grid = rng.sample(list(range(1, n*n)) + [-1], n*n)
+        grid = [grid[i:i+n] for i in range(0, n*n, n)]
+        if is_solvable(grid):
+            return grid, count
+        count += 1
+
+
+class Game:
+    """
+    One game: the board, the move counter and the timer
+    A random board is dealt unless a grid is given, difficulty=(min moves, max moves) deals a 3x3 board
+    that takes that many moves to solve (see utils.generator), other sizes raise ValueError
+    """
+
+    def __init__(self, size: int, grid: List[List[int]] = None, rng: random.Random = random,
+                 difficulty: Tuple[int, int] = None):
+        if difficulty is not None and size != 3:
+            raise ValueError(f"difficulty only works for 3x3 games, not {size}x{size}")
+        self.size = size
+        self.goal = puzzle(size).goal
+        self.tries = 0 # boards generated before a solvable one came up
+        if grid is None and difficulty is not None:
+            from utils.generator import generate
+            grid = generate(*difficulty, rng=rng)
+        elif grid is None:
+            grid, self.tries = random_grid(size, rng)
+        self.board = Board(grid, self.goal)
+        self.moves = 0
+        self.timer = 0.0 # seconds, starts with the first move
+
+    @property
+    def grid(self) -> List[List[int]]:
+        return self.board.grid
+
+    @property
+    def won(self) -> bool:
+        return self.board.solved()
+
+    def state(self) -> int:
+        """
+        Packed state of the board for the solver
+        """
+        return puzzle(self.size).to_state(self.board.grid)
+
+    def move(self, move: str) -> Tuple[Cell, Cell] | None:
+        """
+        Move the empty tile, returns the two cells that changed (see Board.move) or None if it cannot move that way
+        """
+        changed = self.board.move(move)
+        if changed is not None:
+            self.moves += 1
+        return changed
+
+    def move_towards(self, cell: Cell) -> str | None:
+        """
+        The move for a tap on a cell, None if it is not next to the empty tile
+        """
+        return self.board.move_towards(cell)
+
+    def tick(self, dt: float):
+        """
+        Advance the timer (it only runs between the first move and the win)
+        """
+        if self.moves > 0 and not self.won:
+            self.timer += dt
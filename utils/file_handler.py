@@ -60,10 +60,10 @@ def load_resources():
             "assets/tiles/button7.png",
             "assets/tiles/button8.png",
             "assets/btns/back.png",
-            "assets/btns/settings.png"
-            "assets/btns/news_notif.png"
-            "assets/btns/news.png"
-            "assets/btns/play_again.png"
+            "assets/btns/settings.png",
+            "assets/btns/news_notif.png",
+            "assets/btns/news.png",
+            "assets/btns/play_again.png",
         ]
         for file in files:
             RESOURCE_PATHS[file] = resource_path(file)
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# Puzzles of a chosen difficulty (number of moves in the optimal solution), 3x3 only since that is
+# the only size with every distance known. Boards are picked uniformly from the distance range
+# with one lookup in an index of the distance table grouped by distance.
+#
+# Usage: python -m utils.generator [--moves 20-24] [--count 5] [--daily [YYYY-MM-DD]]
+
+from typing import List, Tuple
+from array import array
+from datetime import date
+import random
+
+from utils import distance_table
+
+DIFFICULTIES = {
+    "easy": (6, 14),
+    "medium": (15, 21),
+    "hard": (22, 26),
+    "expert": (27, 31),
+}
+
+_buckets = None # distance -> array of table indexes at that distance
+
+
+def buckets() -> List[array]:
+    """
+    Table indexes grouped by distance, built from the distance table on first use
+    """
+    global _buckets
+    if _buckets is None:
+        table = distance_table.load()
+        if table is None:
+            table = distance_table.build()
+        table = memoryview(table) # iterates as ints, mmap gives 1 byte strings
+        groups = [array("I") for _ in range(max(table) + 1)]
+        for index, depth in enumerate(table):
+            groups[depth].append(index)
+        _buckets = groups
+    return _buckets
+
+
+def count(min_moves: int, max_moves: int) -> int:
+    """
+    Number of boards that take min_moves to max_moves moves to solve
+    """
+    groups = buckets()
+    return sum(len(groups[depth]) for depth in range(max(min_moves, 0), min(max_moves, len(groups) - 1) + 1))
+
+
+def generate(min_moves: int, max_moves: int = None, rng: random.Random = random) -> List[List[int]]:
+    """
+    A uniformly random 3x3 board whose optimal solution is min_moves to max_moves (inclusive) long
+    """
+    if max_moves is None:
+        max_moves = min_moves
+    groups = buckets()
+    pick = rng.randrange(count(min_moves, max_moves) or 1)
+    for depth in range(max(min_moves, 0), min(max_moves, len(groups) - 1) + 1):
+        if pick < len(groups[depth]):
+            return distance_table.BOARD.to_grid(distance_table.unrank(groups[depth][pick]))
+        pick -= len(groups[depth])
+    raise ValueError(f"no 3x3 boards take {min_moves}-{max_moves} moves (31 at most)")
+
+
+def every(moves: int) -> List[List[List[int]]]:
+    """
+    All 3x3 boards that take exactly this many moves to solve
+    """
+    groups = buckets()
+    if not 0 <= moves < len(groups):
+        return []
+    return [distance_table.BOARD.to_grid(distance_table.unrank(index)) for index in groups[moves]]
+
+
+def daily(day: date = None, moves: Tuple[int, int] = DIFFICULTIES["medium"]) -> List[List[int]]:
+    """
+    The puzzle of the day, the same for everyone on the same date
+    """
+    day = day or date.today()
+    return generate(*moves, rng=random.Random(f"{day.isoformat()}:{moves[0]}-{moves[1]}"))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate 3x3 puzzles by optimal solution length")
+    parser.add_argument("--moves", default="20-24", help="a range like 20-24, a single length or one of: " + ", ".join(DIFFICULTIES))
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--daily", nargs="?", const="today", default=None, help="puzzle of the day (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.moves in DIFFICULTIES:
+        moves = DIFFICULTIES[args.moves]
+    else:
+        low, _, high = args.moves.partition("-")
+        try:
+            moves = int(low), int(high or low)
+        except ValueError:
+            parser.error(f"--moves: expected a range like 20-24, a number or a difficulty, not {args.moves!r}")
+    if count(*moves) == 0:
+        parser.error(f"--moves: no 3x3 boards take {moves[0]}-{moves[1]} moves (0-{len(buckets()) - 1})")
+
+    if args.daily is not None:
+        day = date.today() if args.daily == "today" else date.fromisoformat(args.daily)
+        boards = [daily(day, moves)]
+    else:
+        rng = random.Random(args.seed)
+        boards = [generate(*moves, rng=rng) for _ in range(args.count)]
+
+    # Same format as the input of utils.batch
+    for board in boards:
+        print(" ".join(str(0 if tile == -1 else tile) for row in board for tile in row))
@@ -0,0 +1,89 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+from typing import List, Tuple
+
+from utils.autosolver import MOVE_NAMES, puzzle
+
+MAX_DETOUR = 4 # moves off the last solution before it is forgotten
+
+
+class SolutionTracker:
+    """
+    Keeps the last solution of a game and splices it instead of searching again:
+    - any state on the solution path is solved by the rest of the path
+    - a state one move off the path is solved by stepping back onto it
+    - moves made since the last solve are followed, undoing up to MAX_DETOUR of them
+    The rest of the path is as good as the solution it came from, the other splices are at most a few moves longer than optimal.
+    """
+
+    def __init__(self, size: int):
+        self.board = puzzle(size)
+        self.path = {} # state -> index of the move to make from it
+        self.moves: List[str] = []
+        self.optimal = False # whether self.moves is an optimal solution
+        self.state = None # position after the moves followed so far
+        self.solution = None # moves solving self.state
+
+    def remember(self, state: int, moves: List[str], optimal: bool = True):
+        """
+        Called with a freshly solved position and its solution
+        """
+        board = self.board
+        self.moves = list(moves)
+        self.optimal = optimal
+        self.path = {}
+        current, blank = state, board.blank_of(state)
+        for i, move in enumerate(self.moves):
+            self.path[current] = i
+            current, blank = board.move(current, blank, MOVE_NAMES.index(move))
+        self.path[current] = len(self.moves)
+        self.state = state
+        self.solution = list(moves)
+
+    def follow(self, move: str):
+        """
+        Called for every move made on the board (by the player or the autosolver)
+        """
+        if self.solution is None:
+            return
+
+        self.state, _ = self.board.move(self.state, self.board.blank_of(self.state), MOVE_NAMES.index(move))
+        if self.solution and self.solution[0] == move:
+            self.solution.pop(0)
+        elif len(self.solution) < len(self.moves) + MAX_DETOUR:
+            self.solution.insert(0, MOVE_NAMES[MOVE_NAMES.index(move) ^ 1])
+        else:
+            self.solution = None
+
+    def lookup(self, state: int) -> Tuple[List[str], bool] | None:
+        """
+        (a solution for state spliced from the last one, whether it is optimal), or None if a new search is needed
+        """
+        if state in self.path:
+            return self.moves[self.path[state]:], self.optimal
+
+        board = self.board
+        for move, neighbour, _ in board.neighbours(state, board.blank_of(state)):
+            if neighbour in self.path:
+                return [MOVE_NAMES[move]] + self.moves[self.path[neighbour]:], False
+
+        if state == self.state and self.solution is not None:
+            return list(self.solution), False
+
+        return None
@@ -0,0 +1,286 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# Disjoint additive pattern databases for the 4x4 puzzle.
+# Each database stores, for every placement of its tiles, the fewest moves of *its own tiles*
+# needed to reach the goal, so the values of disjoint patterns can be added and stay admissible.
+#
+# Build them with: python -m utils.pattern_db [--partition 5-5-5] [--workers N]
+#
+# File layout (little endian):
+#   header  "SPDB", version (u16), board size (u8), number of patterns (u8), crc32 of everything after the header (u32)
+#   then for every pattern: number of tiles (u8), the tiles (u8 each), table length (u32)
+#   then the tables, one byte per entry, back to back
+
+from typing import List, Tuple
+from collections import deque
+from multiprocessing import Pool
+import mmap
+import os
+import struct
+import zlib
+
+from utils.file_handler import resource_path
+from utils.autosolver import Puzzle, puzzle
+
+# Partitions of the tiles for each board size
+PARTITIONS = {
+    4: {
+        "4-4-4-3": [(1, 2, 5, 6), (3, 4, 7, 8), (9, 10, 13, 14), (11, 12, 15)], # 2x2 blocks, builds in seconds
+        "5-5-5": [(1, 2, 3, 5, 6), (4, 7, 8, 11, 12), (9, 10, 13, 14, 15)],
+        "6-6-3": [(1, 2, 3, 5, 6, 7), (9, 10, 11, 13, 14, 15), (4, 8, 12)], # strongest, slow to build (~30MB)
+    },
+}
+DEFAULT_PARTITIONS = {4: "5-5-5"} # the one shipped in data/, built when the file is missing
+
+MAGIC = b"SPDB"
+VERSION = 1
+HEADER = struct.Struct("<4sHBBI")
+PATTERN_LENGTH = struct.Struct("<I")
+UNKNOWN = 0xFF
+
+_databases = {}
+
+
+def db_path(size: int) -> str:
+    return f"data/pattern_db_{size}x{size}.bin"
+
+
+def build_pattern(board: Puzzle, pattern: Tuple[int, ...]) -> bytearray:
+    """
+    0-1 BFS over (positions of the pattern tiles, position of the empty tile) from the goal.
+    Moving a pattern tile costs 1, moving any other tile costs 0.
+    The table is indexed by the positions of the pattern tiles (bits per slot = board.bits)
+    """
+    bits, cells = board.bits, board.cells
+    k = len(pattern)
+    blank_shift = bits * k
+    table = bytearray([UNKNOWN]) * (1 << blank_shift)
+    visited = bytearray(1 << (blank_shift + bits - 3)) # one bit per abstract state
+
+    start = cells - 1 << blank_shift
+    for slot, tile in enumerate(pattern):
+        start |= (tile - 1) << (bits * slot)
+
+    slots = [bits * slot for slot in range(k)]
+    mask = (1 << bits) - 1
+    positions_mask = (1 << blank_shift) - 1
+    queue = deque([(start, 0)])
+    while queue:
+        abstract, cost = queue.popleft()
+        if visited[abstract >> 3] >> (abstract & 7) & 1:
+            continue
+        visited[abstract >> 3] |= 1 << (abstract & 7)
+        positions = abstract & positions_mask
+        if table[positions] == UNKNOWN:
+            table[positions] = cost
+
+        blank = abstract >> blank_shift
+        for _, new_blank, _ in board.move_table[blank]:
+            for shift in slots:
+                if (positions >> shift) & mask == new_blank: # a pattern tile slides into the blank
+                    child = positions - (new_blank << shift) + (blank << shift) | new_blank << blank_shift
+                    if not visited[child >> 3] >> (child & 7) & 1:
+                        queue.append((child, cost + 1))
+                    break
+            else:
+                child = positions | new_blank << blank_shift
+                if not visited[child >> 3] >> (child & 7) & 1:
+                    queue.appendleft((child, cost))
+
+    return table
+
+
+def _build_job(job: Tuple[int, Tuple[int, ...]]) -> bytearray:
+    """
+    Worker for build(), runs in another process
+    """
+    size, pattern = job
+    return build_pattern(puzzle(size), pattern)
+
+
+def build(size: int, patterns: List[Tuple[int, ...]], workers: int = None) -> List[bytearray]:
+    """
+    Build every pattern's table, one process per pattern (up to workers processes)
+    """
+    jobs = [(size, pattern) for pattern in patterns]
+    if workers == 1 or len(jobs) == 1:
+        return [_build_job(job) for job in jobs]
+
+    with Pool(min(workers or os.cpu_count() or 1, len(jobs))) as pool:
+        return pool.map(_build_job, jobs)
+
+
+def save(size: int, patterns: List[Tuple[int, ...]], tables: list, path: str = None):
+    """
+    Write the tables to disk with a versioned header and a crc32 checksum
+    """
+    body = b"".join(
+        struct.pack(f"<B{len(pattern)}B", len(pattern), *pattern) + PATTERN_LENGTH.pack(len(table))
+        for pattern, table in zip(patterns, tables)
+    )
+    checksum = zlib.crc32(body)
+    for table in tables:
+        checksum = zlib.crc32(table, checksum)
+
+    path = resource_path(path or db_path(size))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, size, len(patterns), checksum))
+        f.write(body)
+        for table in tables:
+            f.write(table)
+
+
+def read(size: int, path: str = None) -> Tuple[List[Tuple[int, ...]], list] | None:
+    """
+    Memory map a database file, returns (patterns, tables) with the tables as read only views into the file
+    Returns None if the file is missing, from another version/size or corrupt
+    """
+    try:
+        with open(resource_path(path or db_path(size)), "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    view = memoryview(data)
+    try:
+        magic, version, file_size, count, checksum = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION or file_size != size:
+            raise ValueError
+
+        offset = HEADER.size
+        patterns, lengths = [], []
+        for _ in range(count):
+            k = view[offset]
+            patterns.append(tuple(view[offset + 1:offset + 1 + k]))
+            lengths.append(PATTERN_LENGTH.unpack_from(view, offset + 1 + k)[0])
+            offset += 1 + k + PATTERN_LENGTH.size
+
+        if offset + sum(lengths) != len(view) or zlib.crc32(view[HEADER.size:]) != checksum:
+            raise ValueError
+
+    except (ValueError, struct.error, IndexError):
+        view.release()
+        data.close()
+        return None
+
+    tables = []
+    for length in lengths:
+        tables.append(view[offset:offset + length])
+        offset += length
+
+    return patterns, tables
+
+
+class PatternDatabase:
+    """
+    Sum of several disjoint pattern databases, used as Puzzle.heuristic
+    """
+
+    def __init__(self, board: Puzzle, patterns: List[Tuple[int, ...]], tables: list):
+        self.board = board
+        self.patterns = patterns
+        self.tables = tables
+        # tile -> (index of its pattern, shift of its slot)
+        self.slot_of = [None] * board.cells
+        for index, pattern in enumerate(patterns):
+            for slot, tile in enumerate(pattern):
+                self.slot_of[tile] = (index, board.bits * slot)
+
+    def indexes(self, state: int) -> List[int]:
+        """
+        Table index of every pattern for a state
+        """
+        bits, mask, slot_of = self.board.bits, self.board.mask, self.slot_of
+        indexes = [0] * len(self.patterns)
+        for cell in range(self.board.cells):
+            tile = (state >> (bits * cell)) & mask
+            if tile:
+                pattern, shift = slot_of[tile]
+                indexes[pattern] |= cell << shift
+        return indexes
+
+    def estimate(self, state: int) -> int:
+        return sum(table[i] for table, i in zip(self.tables, self.indexes(state)))
+
+
+def load_pattern_db(board: Puzzle) -> PatternDatabase | None:
+    """
+    Pattern databases for the board size, memory mapped from disk on first use.
+    If there is no file yet, the default partition is built (and saved for next time)
+    Returns None if there are no patterns for this size
+    """
+    if board.size not in PARTITIONS:
+        return None
+
+    if board.size not in _databases:
+        loaded = read(board.size)
+        if loaded is None:
+            patterns = PARTITIONS[board.size][DEFAULT_PARTITIONS[board.size]]
+            tables = build(board.size, patterns, workers=1)
+            try:
+                save(board.size, patterns, tables)
+            except OSError:
+                pass # read only install, keep it in memory
+            loaded = patterns, tables
+        _databases[board.size] = PatternDatabase(board, *loaded)
+
+    return _databases[board.size]
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Build additive pattern databases")
+    parser.add_argument("--size", type=int, default=4, choices=sorted(PARTITIONS))
+    parser.add_argument("--partition", default=None, help="default: " + ", ".join(
+        f"{name} ({size}x{size})" for size, name in DEFAULT_PARTITIONS.items()
+    ) + "; one of: " + ", ".join(
+        f"{name} ({size}x{size})" for size, partitions in PARTITIONS.items() for name in partitions
+    ))
+    parser.add_argument("--workers", type=int, default=None, help="processes to build with (default: all cores)")
+    args = parser.parse_args()
+
+    partitions = PARTITIONS[args.size]
+    partition = args.partition or DEFAULT_PARTITIONS[args.size]
+    patterns = partitions[partition]
+
+    start_time = time.time()
+    tables = build(args.size, patterns, args.workers)
+    build_time = time.time() - start_time
+    save(args.size, patterns, tables)
+
+    path = resource_path(db_path(args.size))
+    print(f"Built {partition} for {args.size}x{args.size} in {round(build_time, 2)}s")
+    print(f"Wrote {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+
+    board = puzzle(args.size)
+    db = PatternDatabase(board, *read(args.size))
+    states = []
+    for _ in range(10000):
+        cells = list(range(board.cells))
+        random.shuffle(cells)
+        states.append(board.pack(cells))
+    start_time = time.perf_counter()
+    for state in states:
+        db.estimate(state)
+    lookup_time = (time.perf_counter() - start_time) / len(states)
+    print(f"Heuristic lookup: {lookup_time * 1e6:.2f}us per state (full), O(1) per move inside IDA*")
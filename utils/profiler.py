@@ -0,0 +1,201 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# Call counts, latency histograms and counters for the hot paths.
+# Off unless the SLIDINGPUZZLE_PROFILE environment variable is set (or enable() is called),
+# when off every hook is a single flag check.
+#
+#   @timed("game.create_grid")          time every call of a function
+#   with measure("api.news"): ...       time a block
+#   count("solve.nodes", progress.nodes)
+
+from typing import Callable, Dict
+from functools import wraps
+import json
+import os
+import threading
+import time
+
+enabled = bool(os.environ.get("SLIDINGPUZZLE_PROFILE"))
+
+BUCKETS = 32 # histogram bucket i holds latencies from 2**(i-1) to 2**i microseconds
+
+_lock = threading.Lock() # the solver and api calls record from worker threads
+_histograms = {}
+_counters = {}
+
+
+class Histogram:
+    """
+    Latencies in power of two microsecond buckets, plus exact count/total/min/max
+    """
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        micros = seconds * 1e6
+        self.buckets[min(BUCKETS - 1, int(micros).bit_length())] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p: float) -> float:
+        """
+        Upper bound of the bucket holding the p-th percentile, in milliseconds
+        """
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(2 ** i / 1000, self.max * 1000)
+        return self.max * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.count, 4) if self.count else 0,
+            "min_ms": round((self.min or 0) * 1000, 4),
+            "max_ms": round(self.max * 1000, 4),
+            "p50_ms": round(self.percentile(50), 4),
+            "p95_ms": round(self.percentile(95), 4),
+            "p99_ms": round(self.percentile(99), 4),
+            "buckets_us": {2 ** i: n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+def enable(on: bool = True):
+    global enabled
+    enabled = on
+
+
+def record(name: str, seconds: float):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(seconds)
+
+
+def count(name: str, n: int = 1):
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def frame(dt: float):
+    """
+    Schedule on the Kivy clock every frame to collect frame times
+    """
+    if enabled:
+        record("frame", dt)
+
+
+def timed(name: str = None) -> Callable:
+    """
+    Decorator recording every call of a function under name (default: module.function)
+    """
+    def decorator(func: Callable) -> Callable:
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(label, time.perf_counter() - start_time)
+
+        return wrapper
+
+    return decorator
+
+
+class _Measure:
+    __slots__ = ("name", "start_time")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start_time)
+
+
+class _Nothing:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NOTHING = _Nothing()
+
+
+def measure(name: str):
+    """
+    Context manager timing a block under name
+    """
+    return _Measure(name) if enabled else _NOTHING
+
+
+def snapshot() -> Dict:
+    with _lock:
+        return {
+            "timings": {name: histogram.to_dict() for name, histogram in sorted(_histograms.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def summary(limit: int = 8) -> str:
+    """
+    A few lines for the debug overlay: frame times first, then the slowest paths
+    """
+    with _lock:
+        histograms = dict(_histograms)
+    lines = []
+    frames = histograms.pop("frame", None)
+    if frames is not None and frames.count:
+        lines.append(f"frame  {frames.count / max(frames.total, 1e-9):.0f} fps  p95 {frames.percentile(95):.1f}ms")
+    for name, histogram in sorted(histograms.items(), key=lambda item: -item[1].total)[:limit]:
+        lines.append(f"{name}  x{histogram.count}  p95 {histogram.percentile(95):.2f}ms")
+    return "\n".join(lines)
+
+
+def dump(path: str):
+    with open(path, "w") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
@@ -0,0 +1,87 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+import json
+import os
+import time
+
+
+class ResponseCache:
+    """
+    Last good response of every cached API endpoint with its ETag / Last-Modified,
+    kept in memory and (once a path is given) in a JSON file so it works offline after a restart
+    """
+
+    def __init__(self, path: str = None):
+        self.entries = {} # endpoint -> {"body", "etag", "last_modified", "fetched"}
+        self.path = None
+        if path is not None:
+            self.open(path)
+
+    def open(self, path: str):
+        """
+        Use a file for persistence, loading whatever it already has
+        """
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries.update(json.load(f))
+        except (OSError, ValueError):
+            pass # first run or a corrupt file, it gets rewritten on the next response
+
+    def save(self):
+        if self.path is None:
+            return
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass
+
+    def get(self, endpoint: str) -> dict | None:
+        return self.entries.get(endpoint)
+
+    def is_fresh(self, endpoint: str, ttl: float) -> bool:
+        entry = self.entries.get(endpoint)
+        return entry is not None and time.time() - entry["fetched"] < ttl
+
+    def validators(self, endpoint: str) -> dict:
+        """
+        Headers to revalidate the cached response with
+        """
+        entry = self.entries.get(endpoint)
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, endpoint: str, body: str, etag: str = None, last_modified: str = None):
+        self.entries[endpoint] = {"body": body, "etag": etag, "last_modified": last_modified, "fetched": time.time()}
+        self.save()
+
+    def touch(self, endpoint: str):
+        """
+        The server said the cached response is still good (304)
+        """
+        self.entries[endpoint]["fetched"] = time.time()
+        self.save()
@@ -0,0 +1,156 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# Play games headlessly on the engine to load test the rules and the solver.
+#
+# Usage:
+#   python -m utils.simulate random --games 100000 [--size 3] [--moves 100] [--workers N] [--seed 1]
+#   python -m utils.simulate solve --games 200 [--size 3]    (deal, solve and replay the solution)
+#   python -m utils.simulate replay solutions.jsonl            (replay the output of utils.batch)
+
+from typing import Iterable
+from multiprocessing import Pool
+import json
+import os
+import random
+
+from utils.engine import Game
+from utils.board import MOVES
+from utils.autosolver import solve
+
+DIRECTIONS = list(MOVES)
+TICK = 0.2 # seconds of game time per move
+
+
+def play_random(size: int, games: int, max_moves: int, seed: int) -> dict:
+    """
+    Deal games and make random moves until they are won or max_moves moves have been made
+    """
+    rng = random.Random(seed)
+    stats = {"games": 0, "won": 0, "moves": 0, "blocked": 0, "tries": 0}
+    for _ in range(games):
+        game = Game(size, rng=rng)
+        stats["tries"] += game.tries
+        while game.moves < max_moves and not game.won:
+            if game.move(rng.choice(DIRECTIONS)) is None:
+                stats["blocked"] += 1
+            game.tick(TICK)
+        stats["games"] += 1
+        stats["won"] += game.won
+        stats["moves"] += game.moves
+    return stats
+
+
+def play_solved(size: int, games: int, seed: int, strategy: str = "auto") -> dict:
+    """
+    Deal games, solve them and replay the solutions, every game has to end up won
+    """
+    rng = random.Random(seed)
+    stats = {"games": 0, "won": 0, "moves": 0, "blocked": 0, "tries": 0}
+    for _ in range(games):
+        game = Game(size, rng=rng)
+        stats["tries"] += game.tries
+        result = solve([row[:] for row in game.grid], strategy)
+        for move in result[1][1:]:
+            if game.move(move) is None:
+                stats["blocked"] += 1
+            game.tick(TICK)
+        stats["games"] += 1
+        stats["won"] += game.won
+        stats["moves"] += game.moves
+    return stats
+
+
+def replay(records: Iterable[dict]) -> dict:
+    """
+    Replay scripted games ({"board": [[...]], "moves": [...]}, as written by utils.batch)
+    """
+    stats = {"games": 0, "won": 0, "moves": 0, "blocked": 0, "tries": 0}
+    for record in records:
+        if record.get("moves") is None: # unsolvable board
+            continue
+        game = Game(len(record["board"]), [row[:] for row in record["board"]])
+        for move in record["moves"]:
+            if game.move(move) is None:
+                stats["blocked"] += 1
+            game.tick(TICK)
+        stats["games"] += 1
+        stats["won"] += game.won
+        stats["moves"] += game.moves
+    return stats
+
+
+def _job(args: tuple) -> dict:
+    """
+    Worker for run(), runs in another process
+    """
+    mode, size, games, max_moves, seed = args
+    if mode == "solve":
+        return play_solved(size, games, seed)
+    return play_random(size, games, max_moves, seed)
+
+
+def run(mode: str, size: int, games: int, max_moves: int = 100, workers: int = None, seed: int = 0) -> dict:
+    """
+    Split the games between processes (each with its own seed) and add up their stats
+    """
+    workers = min(workers or os.cpu_count() or 1, games) or 1
+    jobs = [(mode, size, games // workers + (i < games % workers), max_moves, seed * 1000 + i) for i in range(workers)]
+    if workers == 1:
+        results = [_job(job) for job in jobs]
+    else:
+        with Pool(workers) as pool:
+            results = pool.map(_job, jobs)
+
+    total = dict.fromkeys(results[0], 0)
+    for result in results:
+        for key, value in result.items():
+            total[key] += value
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Play games headlessly to load test the rules and solver")
+    parser.add_argument("mode", choices=["random", "solve", "replay"])
+    parser.add_argument("input", nargs="?", help="JSONL file for replay")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--moves", type=int, default=100, help="moves per random game")
+    parser.add_argument("--workers", type=int, default=None, help="processes to play with (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    if args.mode == "replay":
+        if args.input is None:
+            parser.error("replay needs a JSONL file")
+        with open(args.input) as f:
+            stats = replay(json.loads(line) for line in f if line.strip())
+    else:
+        stats = run(args.mode, args.size, args.games, args.moves, args.workers, args.seed)
+    elapsed = time.perf_counter() - start_time
+
+    stats["seconds"] = round(elapsed, 3)
+    stats["games_per_minute"] = round(stats["games"] / elapsed * 60)
+    stats["moves_per_second"] = round(stats["moves"] / elapsed)
+    print(json.dumps(stats))
+    if args.mode != "random" and stats["won"] != stats["games"]:
+        raise SystemExit(f"{stats['games'] - stats['won']} games were not won")
@@ -0,0 +1,121 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+from typing import List
+from collections import OrderedDict
+from threading import Lock
+import sqlite3
+
+from utils.autosolver import MOVE_NAMES, puzzle
+
+# Moves are stored as one letter each ("udlr")
+MOVE_LETTERS = "udlr"
+
+
+class SolutionCache:
+    """
+    Optimal solutions keyed on (board size, packed state), with a bounded in-memory LRU
+    and an optional sqlite file behind it that survives restarts.
+
+    Every state along a stored optimal path is stored too (the rest of an optimal path is
+    optimal from there), so replaying or re-solving from the middle of a solution is a hit.
+    Safe to use from the solver thread and the UI thread at the same time.
+    """
+
+    def __init__(self, capacity: int = 4096, path: str = None):
+        self.capacity = capacity
+        self.entries = OrderedDict() # (size, state) -> "udlr..." (most recently used last)
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions (board TEXT PRIMARY KEY, moves TEXT NOT NULL)")
+            self.db.commit()
+
+    @staticmethod
+    def _db_key(size: int, state: int) -> str:
+        return f"{size}:{state:x}" # 5x5 states do not fit in a sqlite integer
+
+    def _remember(self, key: tuple, moves: str):
+        self.entries[key] = moves
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, size: int, state: int) -> List[str] | None:
+        """
+        Cached optimal moves for the board or None
+        """
+        key = (size, state)
+        with self.lock:
+            moves = self.entries.get(key)
+            if moves is not None:
+                self.entries.move_to_end(key)
+            elif self.db is not None:
+                row = self.db.execute("SELECT moves FROM solutions WHERE board = ?", (self._db_key(size, state),)).fetchone()
+                if row is not None:
+                    moves = row[0]
+                    self._remember(key, moves)
+
+            if moves is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return [MOVE_NAMES[MOVE_LETTERS.index(letter)] for letter in moves]
+
+    def put(self, size: int, state: int, moves: List[str]):
+        """
+        Store an optimal solution and the rest of it for every state along the way
+        """
+        board = puzzle(size)
+        letters = "".join(MOVE_LETTERS[MOVE_NAMES.index(move)] for move in moves)
+        rows = []
+        blank = board.blank_of(state)
+        for i, letter in enumerate(letters):
+            rows.append(((size, state), letters[i:]))
+            state, blank = board.move(state, blank, MOVE_LETTERS.index(letter))
+
+        with self.lock:
+            for key, remaining in rows[-self.capacity:]:
+                self._remember(key, remaining)
+            if self.db is not None:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO solutions VALUES (?, ?)",
+                    [(self._db_key(*key), remaining) for key, remaining in rows]
+                )
+                self.db.commit()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+                "capacity": self.capacity,
+            }
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
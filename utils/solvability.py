@@ -0,0 +1,106 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# Which N x N boards can be solved (the goal has the empty tile in the bottom right corner):
+#   odd widths:  the number of inversions must be even
+#   even widths: inversions + row of the empty tile (from the top) must be odd
+# An inversion is a pair of tiles in reading order with the bigger one first, the empty tile is not counted.
+#
+# The batch functions need NumPy (only imported when they are called), boards are rows of an array
+# with 0 for the empty tile.
+
+from typing import List
+
+BATCH_ROWS = 1 << 16 # boards checked per chunk, keeps the pairwise comparisons to a few MB
+
+
+def count_inversions(tiles: List[int]) -> int:
+    """
+    Inversions in a list of distinct positive numbers, O(n log n) with a Fenwick tree
+    Counts, for every tile, the bigger tiles already seen
+    """
+    tree = [0] * (max(tiles, default=0) + 1)
+    inversions = 0
+    for seen, tile in enumerate(tiles):
+        smaller = 0 # tiles seen so far that are <= tile
+        i = tile
+        while i > 0:
+            smaller += tree[i]
+            i -= i & -i
+        inversions += seen - smaller
+        i = tile
+        while i < len(tree):
+            tree[i] += 1
+            i += i & -i
+    return inversions
+
+
+def solvable(cells: List[int], size: int, blank: int = 0) -> bool:
+    """
+    Solvability of a board given as its cells in reading order
+    """
+    inversions = count_inversions([tile for tile in cells if tile != blank])
+    if size % 2:
+        return inversions % 2 == 0
+    return (inversions + cells.index(blank) // size) % 2 == 1
+
+
+def is_solvable(grid: List[List[int]]) -> bool:
+    """
+    Returns True if the N x N puzzle (-1 for the empty tile) is solvable and vice versa
+    """
+    return solvable([tile for row in grid for tile in row], len(grid), -1)
+
+
+def solvable_batch(boards, size: int):
+    """
+    Solvability of many boards at once: boards is a (count, size*size) array, returns a bool array
+    """
+    import numpy as np
+
+    boards = np.asarray(boards)
+    first, second = np.triu_indices(size * size, 1) # every pair of cells in reading order
+    result = np.empty(len(boards), dtype=bool)
+    for start in range(0, len(boards), BATCH_ROWS):
+        chunk = boards[start:start + BATCH_ROWS]
+        later = chunk[:, second]
+        inversions = ((chunk[:, first] > later) & (later != 0)).sum(axis=1, dtype=np.int32)
+        if size % 2 == 0:
+            inversions += np.argmin(chunk, axis=1) // size # row of the empty tile
+            inversions += 1
+        result[start:start + BATCH_ROWS] = inversions % 2 == 0
+    return result
+
+
+def random_boards(size: int, count: int, seed: int = None):
+    """
+    count uniformly random solvable boards as a (count, size*size) array
+    Unsolvable shuffles are fixed by swapping two tiles (which flips the parity) instead of being thrown away,
+    since the swap pairs up solvable and unsolvable boards one to one the result stays uniform
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    cells = size * size
+    boards = np.argsort(rng.random((count, cells)), axis=1).astype(np.uint8 if cells <= 256 else np.uint16)
+    bad = np.flatnonzero(~solvable_batch(boards, size))
+    # First two cells that are not the empty tile: 0 and 1, unless one of them is the empty tile
+    first = np.where(boards[bad, 0] == 0, 1, 0)
+    second = np.where(boards[bad, 0] == 0, 2, np.where(boards[bad, 1] == 0, 2, 1))
+    boards[bad, first], boards[bad, second] = boards[bad, second], boards[bad, first]
+    return boards
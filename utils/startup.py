@@ -0,0 +1,129 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# Staged startup: only the welcome screen is built before the first frame, everything else
+# (sounds, music, network modules, the other screens) is loaded afterwards, one stage per frame.
+# Import this module first in app.py, the clock starts when it is imported.
+#
+# Import time report: python -m utils.startup [--module app] [--top 25]
+
+from typing import Callable, List, Tuple
+import time
+
+STARTED = time.perf_counter()
+
+marks = [] # (name, seconds since STARTED)
+
+
+def mark(name: str) -> float:
+    """
+    Remember when a point of the startup was reached, returns the seconds since startup began
+    """
+    elapsed = time.perf_counter() - STARTED
+    marks.append((name, elapsed))
+    return elapsed
+
+
+class Stages:
+    """
+    Startup work that runs after the first frame, one stage per frame so the welcome screen stays responsive
+    """
+
+    def __init__(self):
+        self.pending = [] # (name, function)
+        self.timings = [] # (name, seconds)
+        self.event = None
+
+    def add(self, name: str, func: Callable):
+        self.pending.append((name, func))
+
+    def start(self):
+        from kivy.clock import Clock
+        self.event = Clock.schedule_once(self.next, 0)
+
+    def run_stage(self):
+        name, func = self.pending.pop(0)
+        start_time = time.perf_counter()
+        func()
+        self.timings.append((name, time.perf_counter() - start_time))
+
+    def next(self, dt):
+        if not self.pending:
+            return
+        self.run_stage()
+        if self.pending:
+            self.event()
+        else:
+            self.done()
+
+    def finish(self):
+        """
+        Run every stage left straight away (something needs them before they got their turn)
+        """
+        if not self.pending:
+            return
+        if self.event is not None:
+            self.event.cancel()
+        while self.pending:
+            self.run_stage()
+        self.done()
+
+    def done(self):
+        from kivy.logger import Logger
+        mark("startup finished")
+        for line in report(self.timings).splitlines():
+            Logger.info(f"Startup: {line}")
+
+
+def report(timings: List[Tuple[str, float]] = ()) -> str:
+    lines = [f"{name:<20} {elapsed * 1000:8.1f}ms" for name, elapsed in marks]
+    lines += [f"  stage {name:<14} {elapsed * 1000:8.1f}ms" for name, elapsed in timings]
+    return "\n".join(lines)
+
+
+def import_times(module: str) -> List[Tuple[int, int, str]]:
+    """
+    [(cumulative µs, self µs, module), ...] for a fresh interpreter importing module (python -X importtime)
+    """
+    import subprocess
+    import sys
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), int(own), name.strip()))
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show which imports slow down startup")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total = max((cumulative for cumulative, _, _ in rows), default=0)
+    print(f"import {args.module}: {total / 1000:.1f}ms")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for cumulative, own, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:10.1f}ms {own / 1000:8.1f}ms  {name}")
@@ -0,0 +1,119 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+from utils.constants import (
+    TELEMETRY_MAX_EVENTS, TELEMETRY_BATCH_SIZE, TELEMETRY_FLUSH_INTERVAL, TELEMETRY_MAX_BACKOFF
+)
+from utils.api import send_events
+
+from collections import deque
+import json
+import os
+import random
+import time
+import trio
+
+
+class Telemetry:
+    """
+    Game events (game start, autosolver used, win, ...) queued locally and uploaded in batches
+    Recording an event never touches the network: it goes into a bounded queue and is appended to a journal
+    file, so events survive restarts while offline. run() uploads them in the background, backing off
+    exponentially while the server cannot be reached. Nothing is uploaded while TELEMETRY_PATH is None.
+    """
+
+    def __init__(self, path: str = None, max_events: int = TELEMETRY_MAX_EVENTS):
+        self.path = path
+        self.events = deque(maxlen=max_events) # oldest events are dropped when full
+        self.journal_lines = 0 # lines in the journal, it is rewritten from the queue past 2 * max_events
+        if path is not None:
+            self.load()
+
+    def load(self):
+        """
+        Queue the events left in the journal by earlier runs
+        """
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    self.journal_lines += 1
+                    try:
+                        self.events.append(json.loads(line))
+                    except ValueError:
+                        pass # half written line from a crash
+        except OSError:
+            pass
+
+    def rewrite_journal(self):
+        if self.path is None:
+            return
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w") as f:
+                f.writelines(json.dumps(event) + "\n" for event in self.events)
+            os.replace(temp_path, self.path)
+            self.journal_lines = len(self.events)
+        except OSError:
+            pass
+
+    def record(self, event: str, **data):
+        """
+        e.g. record("win", size=3, moves=24, time=31.2)
+        """
+        entry = {"event": event, "time": round(time.time(), 3), **data}
+        self.events.append(entry)
+        if self.path is not None:
+            try:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+                self.journal_lines += 1
+            except OSError:
+                pass
+            if self.journal_lines > 2 * self.events.maxlen: # uploads keep failing, drop what the queue dropped
+                self.rewrite_journal()
+
+    async def flush(self, batch_size: int = TELEMETRY_BATCH_SIZE) -> bool:
+        """
+        Upload everything queued, one batch per request. Returns False if a batch failed
+        """
+        sent = False
+        while self.events:
+            batch = list(self.events)[:batch_size]
+            if not await send_events(batch):
+                break
+            # Events recorded meanwhile were appended at the end (and may have pushed some of the batch out)
+            batch_ids = {id(event) for event in batch}
+            while self.events and id(self.events[0]) in batch_ids:
+                self.events.popleft()
+            sent = True
+
+        if sent:
+            self.rewrite_journal()
+        return not self.events
+
+    async def run(self, interval: float = TELEMETRY_FLUSH_INTERVAL):
+        """
+        Run forever in the app's nursery
+        """
+        failures = 0
+        while True:
+            delay = min(TELEMETRY_MAX_BACKOFF, interval * 2 ** failures)
+            await trio.sleep(delay * random.uniform(0.8, 1.2)) # jitter so installs do not retry in step
+            if not self.events:
+                continue
+            failures = 0 if await self.flush() else min(failures + 1, 16)
@@ -0,0 +1,114 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+# Game images packed into one Kivy atlas, decoded once at startup.
+#
+# Build the atlas with: python -m utils.textures  (needs Pillow)
+# Without the atlas the game uses the separate images (loaded through Kivy's image cache as usual)
+
+from utils.file_handler import resource_path
+
+import os
+
+from kivy.atlas import Atlas
+from kivy.cache import Cache
+from kivy.logger import Logger
+
+ATLAS_NAME = "assets/game" # assets/game.atlas + assets/game-0.png
+ATLAS_PAGE_SIZE = 2048
+
+# Image -> largest side in the atlas (the originals are far bigger than they are ever drawn, even on high dpi screens)
+ATLAS_IMAGES = {
+    "assets/bg/frame.png": 1024,
+    "assets/tiles/button.png": 384,
+    "assets/tiles/button1.png": 384,
+    "assets/tiles/button2.png": 384,
+    "assets/tiles/button3.png": 384,
+    "assets/tiles/button4.png": 384,
+    "assets/tiles/button5.png": 384,
+    "assets/tiles/button6.png": 384,
+    "assets/tiles/button7.png": 384,
+    "assets/tiles/button8.png": 384,
+    "assets/btns/back.png": 150,
+    "assets/btns/news.png": 150,
+    "assets/btns/news_notif.png": 150,
+    "assets/btns/play_again.png": 150,
+    "assets/btns/settings.png": 150,
+}
+
+_atlas = None
+
+
+def atlas_id(path: str) -> str:
+    """
+    "assets/tiles/button1.png" -> "button1"
+    """
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def preload():
+    """
+    Decode the atlas once (if it has been built), image_source() then points every widget at it
+    """
+    global _atlas
+    atlas_path = resource_path(ATLAS_NAME)
+    try:
+        _atlas = Atlas(atlas_path + ".atlas")
+        Cache.append("kv.atlas", atlas_path, _atlas) # atlas:// sources use this instead of loading it again
+        for path in ATLAS_IMAGES:
+            _atlas[atlas_id(path)] # every image must be in it
+        Logger.info(f"Game: Loaded texture atlas ({len(ATLAS_IMAGES)} images)")
+    except (OSError, ValueError, KeyError):
+        _atlas = None
+        Logger.info("Game: No texture atlas, using the separate images")
+
+
+def image_source(path: str) -> str:
+    """
+    Source for widgets (background_normal etc.): a region of the atlas if it is loaded, else the file
+    """
+    if _atlas is not None and path in ATLAS_IMAGES:
+        return f"atlas://{resource_path(ATLAS_NAME)}/{atlas_id(path)}"
+    return resource_path(path)
+
+
+def build(page_size: int = ATLAS_PAGE_SIZE):
+    """
+    Scale the images down to ATLAS_IMAGES sizes and pack them into ATLAS_NAME
+    """
+    from PIL import Image
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = []
+        for path, max_side in ATLAS_IMAGES.items():
+            image = Image.open(resource_path(path)).convert("RGBA")
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+            files.append(os.path.join(temp_dir, os.path.basename(path)))
+            image.save(files[-1])
+        return Atlas.create(resource_path(ATLAS_NAME), files, page_size)
+
+
+if __name__ == "__main__":
+    result = build()
+    if not result:
+        raise SystemExit("The images do not fit in the atlas")
+    filename, meta = result
+    print(f"Wrote {filename} ({len(meta)} pages)")
+    for page in meta:
+        print(f"  {page}: {os.path.getsize(os.path.join(os.path.dirname(filename), page)) / 1024:.1f} KB")
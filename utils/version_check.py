@@ -0,0 +1,53 @@
+"""
+Copyright (C) 2022  JustKitkat
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+
+from utils.constants import VERSION, VERSION_CHECK_TTL
+from utils.api import get_latest_version
+
+import trio
+from kivy.event import EventDispatcher
+from kivy.logger import Logger
+from kivy.properties import BooleanProperty, StringProperty
+
+
+class VersionChecker(EventDispatcher):
+    """
+    Checks for a new version in the background, every VERSION_CHECK_TTL seconds
+    KV rules bind to up_to_date, so nothing waits on the network while the widgets are built
+    """
+
+    latest_version = StringProperty("") # empty until the first check succeeds
+    up_to_date = BooleanProperty(True) # assume so until we know otherwise (and while offline)
+
+    def __init__(self, ttl: float = VERSION_CHECK_TTL, **kwargs):
+        super().__init__(**kwargs)
+        self.ttl = ttl
+
+    def on_latest_version(self, instance, value):
+        self.up_to_date = value in ("", VERSION)
+        Logger.info(f"Game: Latest version is {value} ({'up to date' if self.up_to_date else 'update available'})")
+
+    async def run(self):
+        """
+        Run forever in the app's nursery
+        """
+        while True:
+            latest_version = await get_latest_version()
+            if latest_version is not None:
+                self.latest_version = latest_version.strip()
+            await trio.sleep(self.ttl)